@@ -0,0 +1,117 @@
+"""Memory benchmark: plain dicts vs. slotted records vs. streaming output
+
+Builds a synthetic comment-heavy channel and reports the peak traced Python
+memory for three ways of holding it:
+
+  dicts    - the old plain-dict posts, all kept until the final dump
+  records  - Post/Comment/Image records with interned strings, all kept
+  stream   - records written through ArchiveWriter and released per post
+
+Usage:
+    python benchmarks/memory_records.py [posts] [comments_per_post]
+"""
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from post_archiver.models import Post, Comment, Image
+from post_archiver.writer import ArchiveWriter, write_archive
+
+REGULARS = 2000
+
+def _commenter(i):
+    # Names and icons come from separate strings per comment, like parsed HTML
+    n = i % REGULARS
+    return ''.join(['@regular', str(n)]), ''.join(['https://yt3.ggpht.com/avatar', str(n), '=s88-c-k-c0x00ffffff-no-rj'])
+
+def make_dict_post(p, comments_per_post):
+    comments = []
+    for c in range(comments_per_post):
+        name, icon = _commenter(p * comments_per_post + c)
+        comments.append({
+            'commenter_name': name,
+            'timestamp': ''.join([str(c % 12 + 1), ' months ago']),
+            'content': f"Comment {c} on post {p}",
+            'like_count': str(c % 50),
+            'commenter_icon': icon,
+        })
+    return {
+        'post_url': f"https://www.youtube.com/post/{p}",
+        'timestamp': '1 year ago',
+        'content': f"Post {p} content",
+        'member_only': False,
+        'links': [],
+        'images': [{'standard': f"https://yt3.ggpht.com/img{p}=s640", 'source': f"https://yt3.ggpht.com/img{p}=s0"}],
+        'like_count': '120',
+        'comment_count': str(comments_per_post),
+        'comments': comments,
+    }
+
+def make_record_post(p, comments_per_post):
+    # Built the way scraper.py does: comments from the constructor with icons
+    # filled in afterwards, posts field by field on an empty record
+    comments = []
+    icons = []
+    for c in range(comments_per_post):
+        name, icon = _commenter(p * comments_per_post + c)
+        comments.append(Comment(
+            commenter_name=name,
+            timestamp=''.join([str(c % 12 + 1), ' months ago']),
+            content=f"Comment {c} on post {p}",
+            like_count=str(c % 50),
+        ))
+        icons.append(icon)
+    for comment, icon in zip(comments, icons):
+        comment.commenter_icon = icon
+    post = Post()
+    post.post_url = f"https://www.youtube.com/post/{p}"
+    post.timestamp = ''.join(['1 year', ' ago'])
+    post.content = f"Post {p} content"
+    post.like_count = ''.join(['12', '0'])
+    post.comment_count = str(comments_per_post)
+    post.images = [Image(standard=f"https://yt3.ggpht.com/img{p}=s640", source=f"https://yt3.ggpht.com/img{p}=s0")]
+    post.comments = comments
+    return post
+
+def measure(label, fn):
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} peak {peak / (1024 * 1024):8.1f} MiB")
+    return peak
+
+def main():
+    posts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    comments_per_post = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"{posts} posts x {comments_per_post} comments")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / 'posts.json'
+        
+        def run_dicts():
+            data = [make_dict_post(p, comments_per_post) for p in range(posts)]
+            write_archive(out, 'bench', '', data)
+        
+        def run_records():
+            data = [make_record_post(p, comments_per_post) for p in range(posts)]
+            write_archive(out, 'bench', '', data)
+        
+        def run_stream():
+            with ArchiveWriter(out, 'bench', '') as writer:
+                for p in range(posts):
+                    writer.write_post(make_record_post(p, comments_per_post))
+        
+        dicts = measure('dicts', run_dicts)
+        records = measure('records', run_records)
+        stream = measure('stream', run_stream)
+    
+    print(f"records use {records / dicts:.0%} of dicts, stream uses {stream / dicts:.0%}")
+
+if __name__ == '__main__':
+    main()
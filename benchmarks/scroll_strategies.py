@@ -0,0 +1,120 @@
+"""Compare scroll strategies on a synthetic feed
+
+Serves an endless feed that, like YouTube, loads a batch of posts after a
+delay whenever its continuation sentinel comes into view. Each strategy
+(mode, nudges, viewport height, optional self-tuning) scrolls the feed for a
+fixed number of posts through the scraper's own harvest_posts loop, and the
+script reports posts per scroll and posts per second for each, so the fastest
+setting can be picked per browser engine.
+
+Usage:
+    python benchmarks/scroll_strategies.py [--posts 300] [--latency-ms 400] [--browser chromium]
+
+Requires Playwright.
+"""
+import sys
+import time
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from post_archiver.browser import create_driver
+from post_archiver.scraper import harvest_posts
+from post_archiver.scrolling import get_scroll_strategy
+
+FEED_PAGE = """<!DOCTYPE html>
+<html><body><div id="feed"></div><ytd-continuation-item-renderer id="more" style="display:block;height:40px"></ytd-continuation-item-renderer>
+<script>
+const LATENCY = __LATENCY__;
+let next = 0, loading = false;
+function post(i) {
+  return `<ytd-backstage-post-thread-renderer style="display:block;height:420px"><div><ytd-backstage-post-renderer><div><div><div><div>
+    <yt-formatted-string><a href="/post/${i}">${i % 50 + 1} days ago</a></yt-formatted-string>
+  </div></div></div></div>
+  <yt-formatted-string id="content-text">Synthetic post ${i}</yt-formatted-string>
+  <ytd-comment-action-buttons-renderer><div><span>${i}</span></div></ytd-comment-action-buttons-renderer>
+  </ytd-backstage-post-renderer></div></ytd-backstage-post-thread-renderer>`;
+}
+function more() {
+  if (loading) return;
+  loading = true;
+  setTimeout(() => {
+    const html = [];
+    for (let k = 0; k < 10; k++) html.push(post(next++));
+    document.getElementById('feed').insertAdjacentHTML('beforeend', html.join(''));
+    loading = false;
+    // Keep loading while the sentinel is still visible, as YouTube does
+    const rect = document.getElementById('more').getBoundingClientRect();
+    if (rect.top < window.innerHeight) more();
+  }, LATENCY);
+}
+new IntersectionObserver(entries => { if (entries[0].isIntersecting) more(); })
+  .observe(document.getElementById('more'));
+</script></body></html>"""
+
+STRATEGIES = [
+    ('bottom x1', None, {'mode': 'bottom'}),
+    ('bottom x3', None, {'mode': 'bottom', 'nudges': 3}),
+    ('sentinel x1', None, {'mode': 'sentinel'}),
+    ('sentinel x3', None, {'mode': 'sentinel', 'nudges': 3}),
+    ('sentinel tuned', None, {'mode': 'sentinel', 'target_ms': 600}),
+    ('step x4', None, {'mode': 'step', 'nudges': 4}),
+    ('bottom x1, tall viewport', 4000, {'mode': 'bottom'}),
+    ('sentinel tuned, tall viewport', 4000, {'mode': 'sentinel', 'target_ms': 600}),
+]
+
+def make_handler(latency_ms):
+    page = FEED_PAGE.replace('__LATENCY__', str(latency_ms)).encode('utf-8')
+    
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    return FeedHandler
+
+def run_strategy(url, browser, viewport_height, scroll_options, posts):
+    driver = create_driver(browser_type=browser, viewport_height=viewport_height,
+                           scroll_options=scroll_options)
+    try:
+        driver.goto(url)
+        driver.wait_for_selector("ytd-backstage-post-thread-renderer")
+        started = time.monotonic()
+        found = sum(1 for _ in harvest_posts(driver, max_posts=posts))
+        elapsed = time.monotonic() - started
+        return found, elapsed, get_scroll_strategy(driver, 'posts').stats()
+    finally:
+        driver.quit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare scroll strategies on a synthetic feed")
+    parser.add_argument('--posts', type=int, default=300, help="Posts to harvest per strategy (default: 300)")
+    parser.add_argument('--latency-ms', type=int, default=400,
+                        help="Simulated delay before each batch arrives (default: 400)")
+    parser.add_argument('--browser', default='chromium', choices=['chromium', 'firefox', 'webkit'])
+    args = parser.parse_args()
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/@bench/posts"
+    
+    print(f"{'strategy':32} {'posts':>6} {'seconds':>8} {'posts/s':>8} {'scrolls':>8} {'posts/scroll':>13} {'nudges':>7}")
+    try:
+        for name, viewport_height, scroll_options in STRATEGIES:
+            found, elapsed, stats = run_strategy(url, args.browser, viewport_height, scroll_options, args.posts)
+            print(f"{name:32} {found:>6} {elapsed:>8.1f} {found / elapsed:>8.1f} {stats['scrolls']:>8} "
+                  f"{stats['items_per_scroll']:>13} {stats['nudges']:>7}")
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
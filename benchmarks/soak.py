@@ -0,0 +1,254 @@
+"""Long-run soak test for browser and process memory leaks
+
+Serves a synthetic, endless community feed and comment pages from a local
+HTTP server and drives them through the scraper's own code paths:
+create_driver, the pipeline's ship/prune script, parse_post_thread and
+get_post_comments (in a second browser, as in the pipeline). It samples
+Python RSS, browser RSS, open file descriptors, threads and DOM size while
+it runs, writes the samples to a CSV and exits with status 1 if memory grows
+past the threshold after warm-up.
+
+With --fail-every N, every Nth comment page request is dropped without a
+response, so get_post_comments goes through its retry browsers as it does
+when YouTube or a proxy fails.
+
+Usage:
+    python benchmarks/soak.py [--cycles 5000] [--comment-every 50] [--max-growth-mb 150]
+                              [--fail-every 0] [--trace]
+
+Requires Playwright and a Linux /proc filesystem.
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from post_archiver.browser import create_driver
+from post_archiver.pipeline import SHIP_SCRIPT, SHIP_AND_PRUNE_SCRIPT, UNSHIPPED_SELECTOR, POST_LINK_SELECTOR
+from post_archiver.scraper import parse_post_thread, get_post_comments
+from post_archiver.utils import setup_logging
+
+FEED_PAGE = """<!DOCTYPE html>
+<html><body><div id="feed"></div>
+<script>
+let next = 0;
+function post(i) {
+  return `<ytd-backstage-post-thread-renderer><div><ytd-backstage-post-renderer><div><div><div><div>
+    <yt-formatted-string><a href="/post/${i}">${i % 50 + 1} days ago</a></yt-formatted-string>
+  </div></div></div></div>
+  <yt-formatted-string id="content-text">Synthetic post ${i} ${'lorem ipsum '.repeat(40)}</yt-formatted-string>
+  <div id="content-attachment"><ytd-backstage-image-renderer><img id="img" src="//example.invalid/img${i}=s640"></ytd-backstage-image-renderer></div>
+  <ytd-comment-action-buttons-renderer><div><span>${i}</span></div></ytd-comment-action-buttons-renderer>
+  </ytd-backstage-post-renderer></div></ytd-backstage-post-thread-renderer>`;
+}
+function more() {
+  const html = [];
+  for (let k = 0; k < 10; k++) html.push(post(next++));
+  document.getElementById('feed').insertAdjacentHTML('beforeend', html.join(''));
+}
+more();
+window.addEventListener('scroll', () => {
+  if (window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 200) more();
+});
+</script></body></html>"""
+
+COMMENT_PAGE = """<!DOCTYPE html>
+<html><body><div id="comments"></div>
+<script>
+let batches = 0;
+function comment(i) {
+  return `<ytd-comment-thread-renderer><ytd-comment-view-model><div><div>
+    <a><yt-img-shadow><img src="//example.invalid/avatar${i % 200}=s88"></yt-img-shadow></a>
+    <div><h3><a><span>@user${i % 200}</span></a></h3><div><span><a>${i % 12 + 1} months ago</a></span></div></div>
+  </div><div><ytd-expander><div><yt-attributed-string>Comment ${i}</yt-attributed-string></div></ytd-expander>
+  <ytd-comment-engagement-bar><div><span>${i % 9}</span></div></ytd-comment-engagement-bar></div></div>
+  </ytd-comment-view-model></ytd-comment-thread-renderer>`;
+}
+function more() {
+  if (batches >= 3) return;
+  const html = [];
+  for (let k = 0; k < 20; k++) html.push(comment(batches * 20 + k));
+  batches++;
+  document.getElementById('comments').insertAdjacentHTML('beforeend', html.join(''));
+  document.body.style.minHeight = (batches * 3000) + 'px';
+}
+more();
+window.addEventListener('scroll', more);
+</script></body></html>"""
+
+class SyntheticHandler(BaseHTTPRequestHandler):
+    # Drop every Nth comment page request (0: never)
+    fail_every = 0
+    comment_requests = 0
+    dropped = 0
+    _lock = threading.Lock()
+    
+    def _should_fail(self):
+        cls = type(self)
+        with cls._lock:
+            cls.comment_requests += 1
+            if cls.fail_every and cls.comment_requests % cls.fail_every == 0:
+                cls.dropped += 1
+                return True
+        return False
+    
+    def do_GET(self):
+        if self.path.startswith('/@soak'):
+            body = FEED_PAGE
+        elif self.path.startswith('/post/'):
+            if self._should_fail():
+                # Close the connection without a response, so navigation fails
+                self.close_connection = True
+                return
+            body = COMMENT_PAGE
+        else:
+            self.send_error(404)
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+def _rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def _descendants(pid):
+    """All descendant process IDs of pid (browser, renderers, Playwright driver)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def sample(cycle, driver, started):
+    pid = os.getpid()
+    return {
+        'cycle': cycle,
+        'elapsed_s': round(time.monotonic() - started, 1),
+        'python_rss_mb': round(_rss_kb(pid) / 1024, 1),
+        'browser_rss_mb': round(sum(_rss_kb(child) for child in _descendants(pid)) / 1024, 1),
+        'open_fds': len(os.listdir('/proc/self/fd')),
+        'threads': threading.active_count(),
+        'dom_nodes': driver.evaluate("document.getElementsByTagName('*').length"),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test the scraper against a synthetic feed")
+    parser.add_argument('--cycles', type=int, default=5000, help="Scroll cycles (default: 5000)")
+    parser.add_argument('--comment-every', type=int, default=50,
+                        help="Fetch comments every N cycles, 0 to disable (default: 50)")
+    parser.add_argument('--sample-every', type=int, default=25, help="Sample every N cycles (default: 25)")
+    parser.add_argument('--warmup', type=float, default=0.2,
+                        help="Fraction of samples ignored as warm-up (default: 0.2)")
+    parser.add_argument('--max-growth-mb', type=float, default=150,
+                        help="Fail if Python or browser RSS grows more than this after warm-up (default: 150)")
+    parser.add_argument('--max-fd-growth', type=int, default=20,
+                        help="Fail if open file descriptors grow more than this after warm-up (default: 20)")
+    parser.add_argument('--no-prune', action='store_true',
+                        help="Don't empty shipped posts (shows the cost of an ever-growing DOM)")
+    parser.add_argument('--fail-every', type=int, default=0,
+                        help="Drop every Nth comment page request to exercise retries, 0 to disable (default: 0)")
+    parser.add_argument('--trace', action='store_true', help="Show the scraper's debug logging")
+    parser.add_argument('--browser', default='chromium', choices=['chromium', 'firefox', 'webkit'])
+    parser.add_argument('--csv', type=Path, default=Path('soak_samples.csv'), help="Sample output file")
+    args = parser.parse_args()
+    
+    setup_logging(False, args.trace)
+    SyntheticHandler.fail_every = args.fail_every
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SyntheticHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    ship_script = SHIP_SCRIPT if args.no_prune else SHIP_AND_PRUNE_SCRIPT
+    
+    driver = create_driver(browser_type=args.browser)
+    comments_driver = create_driver(browser_type=args.browser) if args.comment_every else None
+    samples = []
+    started = time.monotonic()
+    
+    try:
+        driver.goto(f"{base_url}/@soak/posts")
+        for cycle in range(1, args.cycles + 1):
+            for thread in driver.query_selector_all(UNSHIPPED_SELECTOR):
+                thread_html = thread.evaluate(ship_script, POST_LINK_SELECTOR)
+                if thread_html is not None:
+                    parse_post_thread(thread_html)
+            driver.evaluate("window.scrollTo(0, document.documentElement.scrollHeight)")
+            driver.wait_for_timeout(50)
+            
+            if comments_driver and cycle % args.comment_every == 0:
+                get_post_comments(f"{base_url}/post/{cycle}", comments_driver, None)
+            
+            if cycle % args.sample_every == 0:
+                samples.append(sample(cycle, driver, started))
+                last = samples[-1]
+                print(f"cycle {cycle}: python {last['python_rss_mb']} MB, browser {last['browser_rss_mb']} MB, "
+                      f"fds {last['open_fds']}, dom {last['dom_nodes']}")
+    finally:
+        if comments_driver:
+            comments_driver.quit()
+        driver.quit()
+        server.shutdown()
+    
+    with open(args.csv, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(samples[0]) if samples else ['cycle'])
+        writer.writeheader()
+        writer.writerows(samples)
+    print(f"Wrote {len(samples)} samples to {args.csv}")
+    if args.fail_every:
+        print(f"Dropped {SyntheticHandler.dropped} of {SyntheticHandler.comment_requests} comment page requests")
+    
+    if len(samples) < 4:
+        print("Not enough samples to judge growth")
+        return 0
+    
+    baseline = samples[int(len(samples) * args.warmup)]
+    final = samples[-1]
+    failures = []
+    for key in ('python_rss_mb', 'browser_rss_mb'):
+        growth = final[key] - baseline[key]
+        print(f"{key}: {baseline[key]} -> {final[key]} ({growth:+.1f} MB)")
+        if growth > args.max_growth_mb:
+            failures.append(f"{key} grew {growth:.1f} MB")
+    fd_growth = final['open_fds'] - baseline['open_fds']
+    print(f"open_fds: {baseline['open_fds']} -> {final['open_fds']} ({fd_growth:+d})")
+    if fd_growth > args.max_fd_growth:
+        failures.append(f"open file descriptors grew by {fd_growth}")
+    
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("PASS")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
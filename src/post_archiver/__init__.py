@@ -1,8 +1,27 @@
 """YouTube Community Posts Scraper"""
-from .scraper import get_all_posts
-from .proxy import ProxyManager
-from .browser import create_driver
+import importlib
 
 __version__ = "1.2.3"
 
-__all__ = ["get_all_posts", "ProxyManager", "create_driver"]
+__all__ = ["get_all_posts", "iter_posts", "ProxyManager", "create_driver"]
+
+# Public names are resolved on first access so that importing the package
+# (or running `post-archiver --help`) does not pull in Playwright, bs4 and
+# requests up front.
+_LAZY_ATTRS = {
+    "get_all_posts": ".scraper",
+    "iter_posts": ".scraper",
+    "ProxyManager": ".proxy",
+    "create_driver": ".browser",
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
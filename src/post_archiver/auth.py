@@ -0,0 +1,174 @@
+"""Authenticated session caching for YouTube Community Scraper
+
+Reading cookies from a browser means decrypting its whole cookie store through
+the OS keyring, and a Netscape cookie file has to be reparsed for every new
+browser context. Instead, cookies are converted once into a Playwright
+``storage_state`` file that is cached per cookie source and handed to every
+context created by ``create_driver``.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+from .utils import get_cache_dir
+
+# Browser cookie stores can't be fingerprinted without decrypting them, so
+# cached browser sessions are refreshed after this many seconds.
+BROWSER_STATE_MAX_AGE = 12 * 60 * 60
+
+# Pipeline and worker threads quit their browsers together, and each saves
+# the same state file
+_save_lock = threading.Lock()
+
+def _source_key(cookie_file=None, browser_name=None):
+    """Build a stable key describing where cookies come from."""
+    if cookie_file:
+        return f"file:{Path(cookie_file).resolve()}"
+    return f"browser:{browser_name.lower()}"
+
+def _source_fingerprint(cookie_file=None):
+    """Fingerprint a cookie source so changes invalidate the cache."""
+    if not cookie_file:
+        return None
+    stat = Path(cookie_file).stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _state_paths(key, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir else get_cache_dir('storage_state')
+    # Session cookies are stored in plain text, so keep them private
+    cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    os.chmod(cache_dir, 0o700)
+    name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+    return cache_dir / f"{name}.json", cache_dir / f"{name}.meta.json"
+
+def _write_private(path, data):
+    """Write JSON to path atomically, readable only by the current user."""
+    path = Path(path)
+    # mkstemp creates a uniquely named file with mode 0600
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _earliest_expiry(cookies):
+    expiries = [c['expires'] for c in cookies if (c.get('expires') or -1) > 0]
+    return min(expiries) if expiries else None
+
+def _is_valid(meta, fingerprint, now):
+    if meta.get('fingerprint') != fingerprint:
+        return False
+    if meta.get('expires') and now >= meta['expires']:
+        return False
+    if meta.get('max_age') and now - meta.get('created', 0) >= meta['max_age']:
+        return False
+    return True
+
+def _read_cookies(cookie_file=None, browser_name=None):
+    if cookie_file:
+        from .browser import load_cookies
+        return load_cookies(cookie_file)
+    from .utils import get_browser_cookies
+    return get_browser_cookies(browser_name)
+
+def get_storage_state(cookie_file=None, browser_name=None, cache_dir=None, refresh=False):
+    """Get a cached Playwright storage state file for a cookie source.
+    
+    The cache is invalidated when the cookie file changes, when any cached
+    cookie expires, or (for browser cookies) after BROWSER_STATE_MAX_AGE.
+    
+    Args:
+        cookie_file: Optional path to Netscape format cookie file
+        browser_name: Optional browser to read cookies from ('chrome', 'firefox', 'edge', 'opera')
+        cache_dir: Optional directory for cached state (default: user cache directory)
+        refresh: Re-read cookies from the source even if a valid cache exists
+    
+    Returns:
+        Path to the storage state file as a string, or None if no cookies could be loaded
+    """
+    logger = logging.getLogger('post_archiver')
+    if not cookie_file and not browser_name:
+        return None
+    
+    key = _source_key(cookie_file, browser_name)
+    state_path, meta_path = _state_paths(key, cache_dir)
+    fingerprint = _source_fingerprint(cookie_file)
+    now = time.time()
+    
+    if not refresh and state_path.exists() and meta_path.exists():
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if _is_valid(meta, fingerprint, now):
+                logger.info(f"Using cached session state for {key}")
+                return str(state_path)
+            logger.debug(f"Cached session state for {key} is stale")
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable session cache {meta_path}: {str(e)}")
+    
+    cookies = _read_cookies(cookie_file, browser_name)
+    if not cookies:
+        return None
+    
+    # Drop cookies that have already expired; Playwright requires `expires`
+    # on every cookie in a storage state, with -1 meaning a session cookie
+    valid_cookies = []
+    for cookie in cookies:
+        cookie = dict(cookie)
+        expires = cookie.get('expires') or -1
+        if 0 < expires <= now:
+            continue
+        cookie['expires'] = expires
+        valid_cookies.append(cookie)
+    
+    meta = {
+        'source': key,
+        'fingerprint': fingerprint,
+        'created': now,
+        'expires': _earliest_expiry(valid_cookies),
+        'max_age': None if cookie_file else BROWSER_STATE_MAX_AGE,
+    }
+    
+    try:
+        _write_private(state_path, {'cookies': valid_cookies, 'origins': []})
+        _write_private(meta_path, meta)
+        logger.info(f"Cached session state with {len(valid_cookies)} cookies for {key}")
+    except Exception as e:
+        logger.error(f"Failed to cache session state: {str(e)}")
+        return None
+    
+    return str(state_path)
+
+def save_storage_state(context, state_path):
+    """Write a context's current cookies back to its cached storage state.
+    
+    YouTube rotates some session cookies while browsing; persisting them keeps
+    the cached state usable for the next context or run. The cache metadata
+    is updated to the new cookies' earliest expiry.
+    """
+    logger = logging.getLogger('post_archiver')
+    try:
+        state = context.storage_state()
+        with _save_lock:
+            _write_private(state_path, state)
+            meta_path = Path(state_path).with_suffix('.meta.json')
+            if meta_path.exists():
+                with open(meta_path, encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['expires'] = _earliest_expiry(state.get('cookies', []))
+                meta['updated'] = time.time()
+                _write_private(meta_path, meta)
+        logger.debug(f"Updated cached session state {state_path}")
+    except Exception as e:
+        logger.warning(f"Failed to update session state {state_path}: {str(e)}")
@@ -0,0 +1,163 @@
+"""Deduplicated store for commenter avatars
+
+The same regular commenters show up under almost every post, so avatars are
+stored once per unique image rather than once per comment. Avatar URLs are
+normalized to one canonical size, and each avatar gets a short local ID
+derived from the normalized URL. Comments reference their avatar by that ID
+(commenter_avatar_id), and the file is saved as <store>/<id>.jpg.
+
+The store keeps an index.json mapping IDs to source URLs. Pointing several
+runs at the same store directory downloads each avatar only once ever.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+AVATAR_SIZE = 88
+BATCH_SIZE = 50
+
+# yt3.ggpht.com/<key>=s48-c-k-c0x00ffffff-no-rj
+_SIZE_SUFFIX = re.compile(r'=s\d+[^/]*$')
+# Older style: .../s48-c-k-no-mo-rj-c0xffffff/photo.jpg
+_SIZE_SEGMENT = re.compile(r'/s\d+(-[a-z0-9]+)*/(?=[^/]+$)', re.IGNORECASE)
+
+def normalize_avatar_url(url, size=AVATAR_SIZE):
+    """Rewrite an avatar URL to request the canonical size.
+    
+    Different pages and zoom levels ask for the same avatar at different
+    sizes; normalizing makes them one URL and one download.
+    """
+    if url.startswith('//'):
+        url = f'https:{url}'
+    url = url.replace('://yt3.googleusercontent.com/', '://yt3.ggpht.com/')
+    if _SIZE_SUFFIX.search(url):
+        return _SIZE_SUFFIX.sub(f'=s{size}-c-k-c0x00ffffff-no-rj', url)
+    if _SIZE_SEGMENT.search(url):
+        return _SIZE_SEGMENT.sub(f'/s{size}-c-k-no-mo-rj-c0xffffff/', url)
+    return url
+
+def avatar_id(url):
+    """Return the local ID for a normalized avatar URL."""
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+class AvatarStore:
+    """Downloads each unique commenter avatar once into a directory.
+    
+    Args:
+        root: Store directory; reuse it across runs to keep avatars
+        proxy_manager: Proxies for downloads (see downloads.get_session_pool)
+        size: Canonical avatar size in pixels
+        batch_size: Pending avatars that trigger a concurrent download batch
+    """
+    
+    def __init__(self, root, proxy_manager=None, size=AVATAR_SIZE, batch_size=BATCH_SIZE):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.json'
+        self.proxy_manager = proxy_manager
+        self.size = size
+        self.batch_size = batch_size
+        self.index = self._load_index()
+        self.pending = {}
+        # Comments waiting on each pending avatar, cleared if it fails
+        self.waiting = {}
+        # Avatars that failed this run aren't retried for every comment
+        self.failed_ids = set()
+        self.downloaded = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+    
+    def _load_index(self):
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.getLogger('post_archiver').warning(f"Ignoring unreadable avatar index: {str(e)}")
+            return {}
+    
+    def path(self, avatar_id):
+        """Return the file path for an avatar ID."""
+        return self.root / f"{avatar_id}.jpg"
+    
+    def add(self, url):
+        """Register an avatar URL and return its ID, queuing it if it is new.
+        
+        Returns None for avatars that already failed to download this run.
+        """
+        return self._add(url)
+    
+    def add_comments(self, comments):
+        """Set commenter_avatar_id on each comment that has an icon.
+        
+        The ID is cleared again by flush() if the avatar fails to download,
+        so flush before handing the comments on.
+        """
+        for comment in comments or []:
+            self._add(comment.commenter_icon, comment)
+    
+    def _add(self, url, comment=None):
+        key = None
+        batch_full = False
+        if url:
+            url = normalize_avatar_url(url, self.size)
+            key = avatar_id(url)
+        with self._lock:
+            if key in self.failed_ids:
+                key = None
+            elif key is None or key in self.index:
+                pass
+            elif key not in self.pending and self.path(key).exists():
+                self.index[key] = url
+            else:
+                self.pending[key] = url
+                if comment is not None:
+                    self.waiting.setdefault(key, []).append(comment)
+                batch_full = len(self.pending) >= self.batch_size
+            if comment is not None:
+                comment.commenter_avatar_id = key
+        if batch_full:
+            self.flush()
+        return key
+    
+    def flush(self):
+        """Download all pending avatars concurrently and save the index."""
+        from .downloads import get_session_pool
+        
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            waiting = {key: self.waiting.pop(key, []) for key in pending}
+        if not pending:
+            return
+        
+        items = [(url, self.path(key)) for key, url in pending.items()]
+        results = get_session_pool(self.proxy_manager).download_many(items)
+        
+        with self._lock:
+            for (key, url), ok in zip(pending.items(), results):
+                if ok:
+                    self.index[key] = url
+                    self.downloaded += 1
+                else:
+                    self.failed_ids.add(key)
+                    self.failed += 1
+                    for comment in waiting[key]:
+                        comment.commenter_avatar_id = None
+            self._save_index()
+    
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+    
+    def close(self):
+        """Download what is still pending and report."""
+        self.flush()
+        print(f"Avatars: {self.downloaded} downloaded, {len(self.index)} in {self.root}"
+              + (f", {self.failed} failed" if self.failed else ""))
@@ -1,9 +1,10 @@
 """Browser management functionality for YouTube Community Scraper"""
+import os
 import logging
+import itertools
 from pathlib import Path
 from http.cookiejar import MozillaCookieJar
 from urllib.parse import urlparse
-from playwright.sync_api import sync_playwright
 
 def load_cookies(cookie_file):
     """Load cookies from Netscape format file."""
@@ -32,7 +33,33 @@ def load_cookies(cookie_file):
         logger.error(f"Failed to load cookies from {cookie_file}: {str(e)}")
         return None
 
-def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None, cookies=None):
+# Numbers HAR and trace files so every context of a run gets its own file
+_artifact_counter = itertools.count()
+
+def _next_artifact_path(directory, prefix, suffix):
+    """Return a fresh per-context file path inside directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return str(directory / f"{prefix}_{os.getpid()}_{next(_artifact_counter):03d}{suffix}")
+
+def _route_from_hars(context, har_dir):
+    """Serve all of a context's requests from the HAR files in har_dir."""
+    logger = logging.getLogger('post_archiver')
+    har_files = sorted(Path(har_dir).glob('*.har'))
+    if not har_files:
+        raise FileNotFoundError(f"No HAR files found in {har_dir}")
+    
+    # Routes run in reverse registration order: every recording is tried
+    # first, and requests none of them contain are aborted so a replay
+    # never touches the network
+    context.route("**/*", lambda route: route.abort())
+    for har_file in har_files:
+        context.route_from_har(har_file, not_found='fallback')
+    logger.info(f"Replaying {len(har_files)} HAR files from {har_dir}")
+
+def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None, cookies=None,
+                  storage_state=None, record_har=None, replay_har=None, trace_dir=None,
+                  viewport_height=None, scroll_options=None):
     """Create a new browser instance with the next proxy and optional cookies.
     
     Args:
@@ -40,7 +67,21 @@ def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None,
         browser_type: Browser to use ('chromium', 'firefox', or 'webkit')
         cookie_file: Optional path to Netscape format cookie file
         cookies: Optional list of cookies in Playwright format
+        storage_state: Optional path to a cached Playwright storage state
+            (see auth.get_storage_state); takes precedence over cookies
+        record_har: Optional directory to record this context's traffic to as a HAR file
+        replay_har: Optional directory of recorded HAR files to serve all requests from
+        trace_dir: Optional directory to save a Playwright trace of this context to
+        viewport_height: Optional viewport height in pixels; taller viewports
+            render more posts per scroll
+        scroll_options: Optional keyword arguments for the page's
+            scrolling.ScrollStrategy
+    
+    The returned page's `driver_options` attribute holds the keyword
+    arguments needed to create another driver with the same settings.
     """
+    from playwright.sync_api import sync_playwright
+    
     logger = logging.getLogger('post_archiver')
     logger.info(f"Initializing {browser_type} browser")
     
@@ -104,10 +145,25 @@ def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None,
         
         # Create context
         logger.debug("Creating browser context")
-        context = browser.new_context()
+        context_options = {'storage_state': storage_state}
+        if viewport_height:
+            context_options['viewport'] = {'width': 1280, 'height': viewport_height}
+        if record_har:
+            context_options['record_har_path'] = _next_artifact_path(record_har, 'context', '.har')
+            logger.info(f"Recording HAR to {context_options['record_har_path']}")
+        context = browser.new_context(**context_options)
+        
+        if replay_har:
+            _route_from_hars(context, replay_har)
+        
+        if trace_dir:
+            context.tracing.start(screenshots=True, snapshots=True)
+            logger.debug("Playwright tracing started")
         
         # Handle cookies
-        if cookies:
+        if storage_state:
+            logger.info("Using cached session state")
+        elif cookies:
             logger.info("Setting cookies from browser")
             context.add_cookies(cookies)
         elif cookie_file:
@@ -120,9 +176,12 @@ def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None,
         page = context.new_page()
         
         # Enable detailed browser logging if trace is enabled
+        listeners = []
         if logger.getEffectiveLevel() <= logging.DEBUG:
-            page.on("console", lambda msg: logger.debug(f"Browser console {msg.type}: {msg.text}"))
-            page.on("pageerror", lambda exc: logger.error(f"Page error: {exc}"))
+            def on_console(msg):
+                logger.debug(f"Browser console {msg.type}: {msg.text}")
+            def on_page_error(exc):
+                logger.error(f"Page error: {exc}")
             def on_request_failed(request):
                 try:
                     error_text = request.failure
@@ -135,15 +194,42 @@ def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None,
                     logger.warning(f"Request failed: {request.url} - {error_text}")
                 except Exception as e:
                     logger.debug(f"Error handling request failure: {str(e)}")
-            page.on("requestfailed", on_request_failed)
+            listeners = [
+                ("console", on_console),
+                ("pageerror", on_page_error),
+                ("requestfailed", on_request_failed),
+            ]
+            for event, listener in listeners:
+                page.on(event, listener)
             logger.debug("Detailed browser logging enabled")
         
         # Add helper methods to make transition easier
         def quit_browser():
             logger.debug("Closing browser context and stopping playwright")
-            context.close()
-            browser.close()
-            playwright.stop()
+            # Detach listeners so their closures don't keep the page alive
+            for event, listener in listeners:
+                try:
+                    page.remove_listener(event, listener)
+                except Exception:
+                    pass
+            listeners.clear()
+            try:
+                # Replayed responses don't rotate real cookies; keep the cached state as it is
+                if storage_state and not replay_har:
+                    from .auth import save_storage_state
+                    save_storage_state(context, storage_state)
+                if trace_dir:
+                    trace_path = _next_artifact_path(trace_dir, 'trace', '.zip')
+                    try:
+                        context.tracing.stop(path=trace_path)
+                        logger.info(f"Saved Playwright trace to {trace_path}")
+                    except Exception as e:
+                        logger.warning(f"Failed to save Playwright trace: {str(e)}")
+                context.close()
+                browser.close()
+            finally:
+                # Always stop Playwright, which also ends any browser process left behind
+                playwright.stop()
         
         def execute_script(script, *args):
             logger.debug(f"Executing script: {script[:100]}{'...' if len(script) > 100 else ''}")
@@ -152,20 +238,35 @@ def create_driver(proxy_manager=None, browser_type='chromium', cookie_file=None,
         page.quit = quit_browser
         page.execute_script = execute_script
         
-        # Store browser type for retries
+        # Store browser type and session for retries
         page.browser_type = browser_type
+        page.storage_state_path = storage_state
+        page.driver_options = {
+            'browser_type': browser_type,
+            'storage_state': storage_state,
+            # Plain strings, so the options can be serialized for queue workers
+            'record_har': str(record_har) if record_har else None,
+            'replay_har': str(replay_har) if replay_har else None,
+            'trace_dir': str(trace_dir) if trace_dir else None,
+            'viewport_height': viewport_height,
+            'scroll_options': scroll_options,
+        }
         
         logger.info(f"{browser_type.capitalize()} browser initialized successfully")
         return page
         
     except Exception as e:
         logger.error(f"Error with {browser_type}: {str(e)}")
+        # Don't leave a half-initialized browser running
+        try:
+            playwright.stop()
+        except Exception:
+            pass
         if browser_type != 'chromium':
             logger.warning(f"Falling back to Chromium browser")
-            try:
-                playwright.stop()
-            except:
-                pass
-            return create_driver(proxy_manager, browser_type='chromium')
+            return create_driver(proxy_manager, browser_type='chromium', cookie_file=cookie_file,
+                                 cookies=cookies, storage_state=storage_state,
+                                 record_har=record_har, replay_har=replay_har, trace_dir=trace_dir,
+                                 viewport_height=viewport_height, scroll_options=scroll_options)
         else:
             raise e
@@ -0,0 +1,208 @@
+"""Channel metadata cache
+
+Every run needs the channel's name and icon. Deriving them meant splitting the
+page URL and parsing the whole posts page with BeautifulSoup just to find the
+avatar. Channel metadata (channel ID, canonical handle, title and icon URL)
+is instead read from the page's ytInitialData with a single evaluate call and
+cached on disk with a TTL. The cache is keyed by handle and by channel ID, so
+repeated, batch and watch runs for the same channels skip the lookup, and the
+CLI can resolve bare channel IDs and the canonical spelling of handles without
+a browser.
+"""
+import os
+import re
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+
+from .utils import get_cache_dir
+
+CHANNEL_TTL = 7 * 24 * 60 * 60
+
+CHANNEL_ID_PATTERN = re.compile(r'^UC[\w-]{22}$')
+
+# Reads channel metadata from the page's initial data, with DOM fallbacks
+METADATA_SCRIPT = """() => {
+    const data = window.ytInitialData || {};
+    const meta = (data.metadata || {}).channelMetadataRenderer || {};
+    const text = selector => {
+        const el = document.querySelector(selector);
+        return el ? (el.getAttribute('content') || el.getAttribute('href') || el.textContent || '') : '';
+    };
+    const thumbnails = (meta.avatar || {}).thumbnails || [];
+    const postIcon = document.querySelector(
+        'ytd-backstage-post-thread-renderer > div > ytd-backstage-post-renderer > div > div > a > yt-img-shadow > img');
+    const vanity = meta.vanityChannelUrl || text('link[rel="canonical"]');
+    const handle = (vanity.match(/@[^/?#]+/) || location.pathname.match(/@[^/?#]+/) || [''])[0];
+    return {
+        channel_id: meta.externalId || text('meta[itemprop="identifier"]') || text('meta[itemprop="channelId"]'),
+        handle: handle ? decodeURIComponent(handle) : '',
+        title: meta.title || text('meta[property="og:title"]'),
+        icon: (postIcon && postIcon.src) || (thumbnails.length ? thumbnails[thumbnails.length - 1].url : '')
+            || text('meta[property="og:image"]'),
+    };
+}"""
+
+def channel_key_from_url(url):
+    """Return the cache key ('@handle' or channel ID) for a channel URL, or None."""
+    # Handles with non-ASCII characters arrive percent-encoded in URLs
+    path = unquote(urlparse(url).path if '://' in url else url)
+    for part in path.split('/'):
+        if part.startswith('@'):
+            return part.lower()
+        if CHANNEL_ID_PATTERN.match(part):
+            return part
+    return None
+
+def normalize_channel_url(url):
+    """Turn a channel name, handle, ID or URL into the URL of its posts tab.
+    
+    Bare handles use their canonical spelling if the channel is cached.
+    Raises ValueError for URLs that aren't a YouTube posts tab.
+    """
+    # Check if input is just a channel name or ID (no URL scheme)
+    if not url.startswith(('http://', 'https://')):
+        channel_name = url.strip('@')  # Remove @ if present
+        if CHANNEL_ID_PATTERN.match(channel_name):
+            return f"https://www.youtube.com/channel/{channel_name}/posts"
+        # Use the canonical handle if this channel was seen before
+        cached = ChannelCache().get(channel_name, allow_stale=True)
+        if cached and cached.get('handle'):
+            channel_name = cached['handle'].lstrip('@')
+        return f"https://www.youtube.com/@{channel_name}/posts"
+    
+    parsed = urlparse(url)
+    if not parsed.netloc == 'www.youtube.com':
+        raise ValueError(f"Invalid YouTube URL: {url}")
+    
+    # Check for old endpoint
+    if '/community' in parsed.path:
+        # Convert old endpoint to new endpoint
+        new_url = url.replace('/community', '/posts')
+        print(f"WARNING: The /community endpoint is deprecated. Auto-correcting to: {new_url}")
+        return new_url
+    
+    # Check for new endpoint
+    if '/posts' in parsed.path:
+        return url
+    
+    # If neither endpoint is found, it's invalid
+    raise ValueError(f"Invalid YouTube community URL: {url}")
+
+def channel_name_from_url(url):
+    """Return the channel's handle (without @) or ID from its URL."""
+    key = channel_key_from_url(url)
+    if key is None:
+        raise ValueError(f"Can't find a channel in URL: {url}")
+    if key.startswith('@'):
+        # Keep the handle's original spelling
+        path = unquote(urlparse(url).path if '://' in url else url)
+        return next(part for part in path.split('/') if part.lower() == key)[1:]
+    return key
+
+class ChannelCache:
+    """Persistent channel metadata keyed by lowercase handle and channel ID.
+    
+    Args:
+        path: Cache file (default: channels.json in the user cache directory)
+        ttl: Seconds before an entry is looked up again
+    
+    If the cache directory can't be resolved the cache starts empty and is
+    never saved; the directory itself is only created when saving.
+    """
+    
+    def __init__(self, path=None, ttl=CHANNEL_TTL):
+        if path:
+            self.path = Path(path)
+        else:
+            try:
+                self.path = get_cache_dir(create=False) / 'channels.json'
+            except (OSError, RuntimeError) as e:
+                logging.getLogger('post_archiver').warning(f"Channel cache disabled: {str(e)}")
+                self.path = None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.entries = self._load()
+    
+    def _load(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.getLogger('post_archiver').warning(f"Ignoring unreadable channel cache: {str(e)}")
+            return {}
+    
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+    
+    def get(self, key, allow_stale=False):
+        """Return cached metadata for a handle or channel ID, or None."""
+        if not key:
+            return None
+        if key.startswith('@') or not CHANNEL_ID_PATTERN.match(key):
+            key = '@' + key.lstrip('@').lower()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if not allow_stale and time.time() - entry.get('resolved_at', 0) >= self.ttl:
+            return None
+        return entry
+    
+    def get_url(self, url, allow_stale=False):
+        """Return cached metadata for a channel URL, or None."""
+        return self.get(channel_key_from_url(url), allow_stale)
+    
+    def put(self, info):
+        """Store metadata under its handle and channel ID and save the cache."""
+        entry = dict(info, resolved_at=time.time())
+        with self._lock:
+            if entry.get('handle'):
+                self.entries[entry['handle'].lower()] = entry
+            if entry.get('channel_id'):
+                self.entries[entry['channel_id']] = entry
+            try:
+                self._save()
+            except OSError as e:
+                logging.getLogger('post_archiver').warning(f"Failed to save channel cache: {str(e)}")
+        return entry
+
+def get_channel_metadata(driver, cache=None, refresh=False):
+    """Get metadata for the channel shown in driver, from the cache if fresh.
+    
+    Returns a dict with channel_id, handle ('@name'), title, icon and name,
+    the name used for output files (the handle without @, or the channel ID).
+    """
+    logger = logging.getLogger('post_archiver')
+    cache = cache or ChannelCache()
+    
+    info = None if refresh else cache.get_url(driver.url)
+    if info:
+        logger.info(f"Using cached metadata for {info.get('handle') or info.get('channel_id')}")
+    else:
+        info = driver.evaluate(METADATA_SCRIPT)
+        if info.get('icon', '').startswith('//'):
+            info['icon'] = f"https:{info['icon']}"
+        if info.get('handle') or info.get('channel_id'):
+            info = cache.put(info)
+        logger.debug(f"Resolved channel metadata: {info}")
+    
+    info = dict(info)
+    key = channel_key_from_url(driver.url)
+    if key and key.startswith('@'):
+        info['name'] = channel_name_from_url(driver.url)
+    else:
+        info['name'] = (info.get('handle') or '').lstrip('@') or info.get('channel_id') or key or 'channel'
+    return info
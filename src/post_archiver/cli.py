@@ -1,45 +1,23 @@
 """Command-line interface for YouTube Community Scraper"""
+import sys
 import argparse
 import logging
 from pathlib import Path
-from urllib.parse import urlparse
 from http.cookiejar import MozillaCookieJar
 
 from . import __version__
 from .proxy import ProxyManager
-from .browser import create_driver
-from .scraper import get_all_posts
-from .utils import setup_logging, get_browser_cookies
+from .utils import setup_logging
 
 VERSION = __version__
 
 def validate_url(url):
     """Validate YouTube community URL."""
-    # Check if input is just a channel name (no URL scheme)
-    if not url.startswith(('http://', 'https://')):
-        channel_name = url.strip('@')  # Remove @ if present
-        constructed_url = f"https://www.youtube.com/@{channel_name}/posts"
-        return constructed_url
-    
-    parsed = urlparse(url)
-    if not parsed.netloc == 'www.youtube.com':
-        raise argparse.ArgumentTypeError(f"Invalid YouTube URL: {url}")
-    
-    # Check for old endpoint
-    if '/community' in parsed.path:
-        # Convert old endpoint to new endpoint
-        new_url = url.replace('/community', '/posts')
-        print(f"WARNING: The /community endpoint is deprecated. Auto-correcting to: {new_url}")
-        return new_url
-    
-    # Check for new endpoint
-    if '/posts' in parsed.path:
-        return url
-    
-    # If neither endpoint is found, it's invalid
-    raise argparse.ArgumentTypeError(
-        f"Invalid YouTube community URL: {url}\n"
-    )
+    from .channels import normalize_channel_url
+    try:
+        return normalize_channel_url(url)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 def validate_proxy(value):
     """Validate proxy string or file."""
@@ -84,6 +62,24 @@ def validate_amount(value):
             return float('inf')
         raise argparse.ArgumentTypeError("Amount must be a positive integer or 'max'")
 
+def validate_since(value):
+    """Validate --since date."""
+    from .dates import parse_date
+    try:
+        return parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid date: {value} (use YYYY-MM-DD, an age like 30d, 6m or 1y, or '3 weeks ago')")
+
+def validate_until(value):
+    """Validate --until date; a plain date includes that whole day."""
+    from .dates import parse_date
+    try:
+        return parse_date(value, end_of_day=True)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid date: {value} (use YYYY-MM-DD, an age like 30d, 6m or 1y, or '3 weeks ago')")
+
 def validate_cookie_file(value):
     """Validate cookie file in Netscape format."""
     try:
@@ -93,7 +89,60 @@ def validate_cookie_file(value):
     except Exception as e:
         raise argparse.ArgumentTypeError(f"Invalid cookie file: {str(e)}")
 
-def parse_args():
+def _add_session_arguments(parser):
+    """Add proxy, browser and cookie options shared by the scrape and watch commands."""
+    parser.add_argument('--proxy', type=validate_proxy,
+                      help="Proxy file or single proxy string")
+    
+    # Add browser selection argument
+    parser.add_argument('--browser', type=str, choices=['chromium', 'firefox', 'webkit'],
+                      default='chromium', help="Browser to use (default: chromium)")
+    
+    # Update cookie handling options
+    cookie_group = parser.add_mutually_exclusive_group()
+    cookie_group.add_argument('--cookies', type=validate_cookie_file,
+                          help="Path to cookies file in Netscape format")
+    cookie_group.add_argument('--browser-cookies', type=str,
+                          choices=['chrome', 'firefox', 'edge', 'opera'],
+                          help="Get cookies from browser (requires browser-cookie3)")
+    
+    parser.add_argument('--refresh-cookies', action='store_true',
+                      help="Re-read cookies instead of using the cached session state")
+
+def _load_session(args):
+    """Build the proxy manager and cached session state from parsed arguments.
+    
+    Returns (proxy_manager, storage_state), or None if cookies couldn't be loaded.
+    """
+    from .auth import get_storage_state
+    
+    # Configure proxy
+    if args.proxy:
+        if Path(args.proxy).is_file():
+            proxy_manager = ProxyManager(proxy_file=args.proxy)
+        else:
+            proxy_manager = ProxyManager(single_proxy=args.proxy)
+    else:
+        proxy_manager = None
+    
+    # Load cookies once into a cached session state shared by every browser context
+    storage_state = None
+    if args.cookies or args.browser_cookies:
+        storage_state = get_storage_state(
+            cookie_file=args.cookies,
+            browser_name=args.browser_cookies,
+            refresh=args.refresh_cookies
+        )
+        if not storage_state:
+            if args.browser_cookies:
+                print("Failed to get cookies from browser. Please check if browser is installed and you have required permissions.")
+            else:
+                print(f"Failed to load cookies from {args.cookies}")
+            return None
+    
+    return proxy_manager, storage_state
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description="YouTube Community Posts Scraper",
         usage='%(prog)s [OPTIONS] url [amount]',
@@ -109,6 +158,16 @@ Amount:
   Specify number of posts to scrape (default: max)
   Use 'max' or any number <= 0 to scrape all posts
 
+Dates:
+  --since and --until accept YYYY-MM-DD, an age like 30d, 2w, 6m or 1y, or
+  '3 weeks ago'. Post dates are approximated from YouTube's relative
+  timestamps (a month counts as 30 days, a year as 365 days).
+
+Commands:
+  %(prog)s watch URL [URL ...]   Keep polling channels for new or edited posts
+  %(prog)s worker QUEUE          Run comment and image jobs from a --queue database
+  %(prog)s reextract DIR         Rebuild archives from a --snapshot-dir store
+
 Examples:
   %(prog)s https://www.youtube.com/@channel/posts
   %(prog)s https://www.youtube.com/@channel/posts 50
@@ -130,6 +189,13 @@ Examples:
     parser.add_argument('-c', '--get-comments', action='store_true',
                       help="Get comments from posts (WARNING: This is slow) (default: False)")
     
+    parser.add_argument('--since', type=validate_since,
+                      help="Only get posts from this date on (YYYY-MM-DD, 30d, 6m, 1y); "
+                           "scrolling stops once older posts are reached")
+    
+    parser.add_argument('--until', type=validate_until,
+                      help="Only get posts up to this date (YYYY-MM-DD, 30d, 6m, 1y)")
+    
     parser.add_argument('-i', '--get-images', action='store_true',
                       help="Get images from posts (default: False)")
     
@@ -139,12 +205,86 @@ Examples:
     parser.add_argument('-q', '--image-quality', type=validate_image_quality,
                       default='all', help="Image quality: src, sd, or all (default: all)")
     
-    parser.add_argument('--proxy', type=validate_proxy,
-                      help="Proxy file or single proxy string")
+    parser.add_argument('--process-images', action='store_true',
+                      help="Detect the real format of downloaded images and record their size and "
+                           "SHA-256 (requires --download-images and Pillow)")
+    
+    parser.add_argument('--thumbnails', type=int, metavar='PX',
+                      help="Also write thumbnails no larger than PX pixels (implies --process-images)")
+    
+    parser.add_argument('--transcode', choices=['webp', 'avif'],
+                      help="Convert downloaded images to WebP or AVIF (implies --process-images)")
+    
+    parser.add_argument('--download-avatars', action='store_true',
+                      help="Download commenter avatars once each and reference them from comments "
+                           "(requires --get-comments)")
+    
+    parser.add_argument('--avatar-store', type=Path, metavar='DIR',
+                      help="Avatar store to reuse across runs, so each avatar is downloaded only once "
+                           "(implies --download-avatars; default: avatars/ next to the archive)")
     
     parser.add_argument('-o', '--output', type=Path,
                       help="Output directory (default: current directory)")
     
+    parser.add_argument('--stream', action='store_true',
+                      help="Write each post to the output file as soon as it is finished "
+                           "and release it from memory (for very large channels)")
+    
+    parser.add_argument('--queue', type=str,
+                      help="SQLite job queue file; run comments and image downloads as jobs "
+                           "that other local processes can help with")
+    
+    parser.add_argument('--workers', type=int, default=1,
+                      help="Local worker processes for --queue; 0 waits for external workers (default: 1)")
+    
+    parser.add_argument('--pipeline', action='store_true',
+                      help="Overlap scrolling, parsing and comment/image collection")
+    
+    parser.add_argument('--parse-workers', type=int,
+                      help="Parser processes for --pipeline (default: CPU count)")
+    
+    parser.add_argument('--enrich-workers', type=int, default=2,
+                      help="Comment/image threads for --pipeline, each with its own browser (default: 2)")
+    
+    parser.add_argument('--prune-dom', action='store_true',
+                      help="With --pipeline, empty posts in the page once read to keep browser memory flat on long runs")
+    
+    parser.add_argument('--scroll-mode', choices=['bottom', 'sentinel', 'step'], default='bottom',
+                      help="How to load more posts and comments: scroll to the bottom, scroll the "
+                           "continuation element into view, or scroll by --scroll-step (default: bottom)")
+    
+    parser.add_argument('--scroll-nudges', type=int, default=1, metavar='N',
+                      help="Scrolls per wait, loading up to N batches at a time (default: 1)")
+    
+    parser.add_argument('--scroll-step', type=int, metavar='PX',
+                      help="Pixels per scroll for --scroll-mode step (default: viewport height)")
+    
+    parser.add_argument('--scroll-target-ms', type=int, metavar='MS',
+                      help="Tune the scroll nudges automatically to keep each batch within MS milliseconds")
+    
+    parser.add_argument('--viewport-height', type=int, metavar='PX',
+                      help="Browser viewport height; taller viewports render more posts per scroll")
+    
+    parser.add_argument('--snapshot-dir', type=Path, metavar='DIR',
+                      help="Save raw post and comment HTML to a snapshot store in DIR "
+                           "for offline re-extraction with 'post-archiver reextract'")
+    
+    har_group = parser.add_mutually_exclusive_group()
+    har_group.add_argument('--record-har', type=Path, metavar='DIR',
+                      help="Record browser traffic to HAR files in DIR")
+    har_group.add_argument('--replay-har', type=Path, metavar='DIR',
+                      help="Serve browser traffic from HAR files recorded with --record-har "
+                           "instead of the network (image downloads still use the network)")
+    
+    parser.add_argument('--profile', type=Path, metavar='DIR',
+                      help="Profile each phase of the run and write profiles and a summary to DIR")
+    
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                      help="Python profiler for --profile (default: cprofile)")
+    
+    parser.add_argument('--profile-browser', action='store_true',
+                      help="Also save Playwright traces of every browser context to the --profile directory")
+    
     parser.add_argument('-v', '--verbose', action='store_true',
                       help="Show basic progress information")
     
@@ -154,23 +294,18 @@ Examples:
     parser.add_argument('--version', action='version',
                       version=f'%(prog)s {VERSION}')
     
-    # Add browser selection argument
-    parser.add_argument('--browser', type=str, choices=['chromium', 'firefox', 'webkit'],
-                      default='chromium', help="Browser to use (default: chromium)")
-    
-    # Update cookie handling options
-    cookie_group = parser.add_mutually_exclusive_group()
-    cookie_group.add_argument('--cookies', type=validate_cookie_file,
-                          help="Path to cookies file in Netscape format")
-    cookie_group.add_argument('--browser-cookies', type=str,
-                          choices=['chrome', 'firefox', 'edge', 'opera'],
-                          help="Get cookies from browser (requires browser-cookie3)")
+    _add_session_arguments(parser)
     
     # Add member-only flag
-    parser.add_argument('--member-only', action='store_true',
+    member_group = parser.add_mutually_exclusive_group()
+    member_group.add_argument('--member-only', action='store_true',
                       help="Only get membership-only posts (requires --cookies or --browser-cookies)")
+    member_group.add_argument('--member-output', choices=['combined', 'split', 'both'], default='combined',
+                      help="Write members-only and public posts from one pass to one archive, to separate "
+                           "_members and _public archives, or both (split and both require "
+                           "--cookies or --browser-cookies; default: combined)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Validate dependent arguments
     if args.download_images and not args.get_images:
@@ -179,42 +314,236 @@ Examples:
     if args.image_quality != 'all' and not args.get_images:
         parser.error("--image-quality requires --get-images")
     
+    if args.scroll_nudges < 1:
+        parser.error("--scroll-nudges must be at least 1")
+    
+    if args.thumbnails or args.transcode:
+        args.process_images = True
+    if args.process_images and not args.download_images:
+        parser.error("--process-images, --thumbnails and --transcode require --download-images")
+    
+    if args.avatar_store:
+        args.download_avatars = True
+    if args.download_avatars and not args.get_comments:
+        parser.error("--download-avatars requires --get-comments")
+    
     # Update validation
     if args.member_only and not (args.cookies or args.browser_cookies):
         parser.error("--member-only requires either --cookies or --browser-cookies")
     
+    if args.member_output != 'combined' and not (args.cookies or args.browser_cookies):
+        parser.error("--member-output split and both require either --cookies or --browser-cookies")
+    
+    if args.since and args.until and args.since > args.until:
+        parser.error("--since must be before --until")
+    
+    if args.workers < 0:
+        parser.error("--workers must be 0 or more")
+    
+    if args.replay_har and not args.replay_har.is_dir():
+        parser.error(f"--replay-har directory not found: {args.replay_har}")
+    
+    if args.profile_browser and not args.profile:
+        parser.error("--profile-browser requires --profile")
+    
+    if args.prune_dom and not args.pipeline:
+        parser.error("--prune-dom requires --pipeline")
+    
+    if args.pipeline and args.queue:
+        parser.error("--pipeline and --queue cannot be used together")
+    
+    if (args.parse_workers is not None and args.parse_workers < 1) or args.enrich_workers < 1:
+        parser.error("--parse-workers and --enrich-workers must be at least 1")
+    
     return args
 
-def main():
-    args = parse_args()
+def worker_main(argv):
+    """Run the `worker` command."""
+    parser = argparse.ArgumentParser(
+        prog='post-archiver worker',
+        description="Run comment and image jobs from a post-archiver job queue"
+    )
+    parser.add_argument('queue', help="Job queue file created with --queue")
+    parser.add_argument('--idle-timeout', type=float, default=30,
+                      help="Exit after the queue has been idle this many seconds (default: 30)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                      help="Show basic progress information")
+    parser.add_argument('-t', '--trace', action='store_true',
+                      help="Show detailed debug information")
+    args = parser.parse_args(argv)
     setup_logging(args.verbose, args.trace)
     
+    from .jobqueue import run_worker
+    completed = run_worker(args.queue, idle_timeout=args.idle_timeout)
+    print(f"Completed {completed} jobs")
+
+def watch_main(argv):
+    """Run the `watch` command."""
+    parser = argparse.ArgumentParser(
+        prog='post-archiver watch',
+        description="Keep polling channels and archive new or edited posts",
+        epilog="Each channel is archived to OUTPUT/<channel>/posts_<channel>.jsonl. "
+               "Intervals adapt to each channel's posting frequency between "
+               "--min-interval and --max-interval."
+    )
+    parser.add_argument('urls', nargs='+', type=validate_url, metavar='url',
+                      help="YouTube channel posts URLs or channel names")
+    parser.add_argument('-c', '--get-comments', action='store_true',
+                      help="Get comments from new posts")
+    parser.add_argument('-i', '--get-images', action='store_true',
+                      help="Get images from new posts")
+    parser.add_argument('-d', '--download-images', action='store_true',
+                      help="Download images (requires --get-images)")
+    parser.add_argument('-q', '--image-quality', type=validate_image_quality,
+                      default='all', help="Image quality: src, sd, or all (default: all)")
+    parser.add_argument('-o', '--output', type=Path,
+                      help="Output directory (default: current directory)")
+    parser.add_argument('--interval', type=float, default=15,
+                      help="Initial minutes between checks of a channel (default: 15)")
+    parser.add_argument('--min-interval', type=float, default=5,
+                      help="Shortest minutes between checks (default: 5)")
+    parser.add_argument('--max-interval', type=float, default=360,
+                      help="Longest minutes between checks (default: 360)")
+    parser.add_argument('--member-only', action='store_true',
+                      help="Only archive membership-only posts (requires --cookies or --browser-cookies)")
+    _add_session_arguments(parser)
+    parser.add_argument('-v', '--verbose', action='store_true',
+                      help="Show basic progress information")
+    parser.add_argument('-t', '--trace', action='store_true',
+                      help="Show detailed debug information")
+    args = parser.parse_args(argv)
+    
+    if args.download_images and not args.get_images:
+        parser.error("--download-images requires --get-images")
+    if args.member_only and not (args.cookies or args.browser_cookies):
+        parser.error("--member-only requires either --cookies or --browser-cookies")
+    if not 0 < args.min_interval <= args.interval <= args.max_interval:
+        parser.error("intervals must satisfy 0 < --min-interval <= --interval <= --max-interval")
+    
+    setup_logging(args.verbose, args.trace)
+    
+    session = _load_session(args)
+    if session is None:
+        return
+    proxy_manager, storage_state = session
+    
+    from .watch import Watcher
+    watcher = Watcher(
+        args.urls,
+        output_dir=args.output if args.output else Path.cwd(),
+        proxy_manager=proxy_manager,
+        browser_type=args.browser,
+        storage_state=storage_state,
+        get_comments=args.get_comments,
+        get_images=args.get_images,
+        download_images=args.download_images,
+        image_quality=args.image_quality,
+        member_only=args.member_only,
+        interval=args.interval * 60,
+        min_interval=args.min_interval * 60,
+        max_interval=args.max_interval * 60
+    )
+    print(f"Watching {len(args.urls)} channels, press Ctrl+C to stop")
+    watcher.run()
+
+def reextract_main(argv):
+    """Run the `reextract` command."""
+    parser = argparse.ArgumentParser(
+        prog='post-archiver reextract',
+        description="Rebuild archives from a snapshot store without a browser"
+    )
+    parser.add_argument('snapshot_dir', type=Path, help="Snapshot store created with --snapshot-dir")
+    parser.add_argument('-o', '--output', type=Path,
+                      help="Output directory (default: current directory)")
+    parser.add_argument('-q', '--image-quality', type=validate_image_quality,
+                      default='all', help="Image quality: src, sd, or all (default: all)")
+    parser.add_argument('--channel', action='append',
+                      help="Only rebuild this channel (can be repeated)")
+    parser.add_argument('--workers', type=int,
+                      help="Worker processes (default: CPU count)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                      help="Show basic progress information")
+    parser.add_argument('-t', '--trace', action='store_true',
+                      help="Show detailed debug information")
+    args = parser.parse_args(argv)
+    
+    if not (args.snapshot_dir / 'manifest.jsonl').is_file():
+        parser.error(f"Not a snapshot store: {args.snapshot_dir}")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
+    setup_logging(args.verbose, args.trace)
+    
+    from .snapshots import reextract
+    reextract(
+        args.snapshot_dir,
+        output_dir=args.output,
+        image_quality=args.image_quality,
+        channels=args.channel,
+        workers=args.workers
+    )
+
+COMMANDS = {
+    'worker': worker_main,
+    'watch': watch_main,
+    'reextract': reextract_main,
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    
+    args = parse_args(argv)
+    setup_logging(args.verbose, args.trace)
+    
+    # Heavy dependencies (Playwright, bs4, requests) are only needed once we
+    # actually scrape, so --help, --version and argument errors stay fast.
+    from .browser import create_driver
+    from .scraper import get_all_posts
+    from .downloads import close_session_pools
+    
     # Configure output directory
     output_dir = args.output if args.output else Path.cwd()
     
-    # Configure proxy
-    if args.proxy:
-        if Path(args.proxy).is_file():
-            proxy_manager = ProxyManager(proxy_file=args.proxy)
-        else:
-            proxy_manager = ProxyManager(single_proxy=args.proxy)
-    else:
-        proxy_manager = None
+    session = _load_session(args)
+    if session is None:
+        return
+    proxy_manager, storage_state = session
+    
+    if args.process_images:
+        from .imageproc import check_support
+        try:
+            check_support(args.transcode)
+        except RuntimeError as e:
+            print(str(e))
+            return
     
-    # Get cookies from browser if specified
-    cookies = None
-    if args.browser_cookies:
-        cookies = get_browser_cookies(args.browser_cookies)
-        if not cookies:
-            print("Failed to get cookies from browser. Please check if browser is installed and you have required permissions.")
+    profiler = None
+    if args.profile:
+        from .profiling import Profiler
+        try:
+            profiler = Profiler(args.profile, engine=args.profiler)
+        except RuntimeError as e:
+            print(str(e))
             return
+        profiler.start_phase('startup')
     
     # Create initial driver with selected browser and cookies
     driver = create_driver(
         proxy_manager=proxy_manager,
         browser_type=args.browser,
-        cookie_file=args.cookies,
-        cookies=cookies  # Add browser cookies
+        storage_state=storage_state,
+        record_har=args.record_har,
+        replay_har=args.replay_har,
+        trace_dir=args.profile if args.profile_browser else None,
+        viewport_height=args.viewport_height,
+        scroll_options={
+            'mode': args.scroll_mode,
+            'nudges': args.scroll_nudges,
+            'step': args.scroll_step,
+            'target_ms': args.scroll_target_ms,
+        }
     )
     
     try:
@@ -232,11 +561,34 @@ def main():
             verbose=args.verbose,
             trace=args.trace,
             max_posts=args.amount,
-            member_only=args.member_only
+            member_only=args.member_only,
+            stream=args.stream,
+            job_queue=args.queue,
+            workers=args.workers,
+            pipeline=args.pipeline,
+            parse_workers=args.parse_workers,
+            enrich_workers=args.enrich_workers,
+            prune_dom=args.prune_dom,
+            snapshot_dir=args.snapshot_dir,
+            since=args.since,
+            until=args.until,
+            profiler=profiler,
+            download_avatars=args.download_avatars,
+            avatar_dir=args.avatar_store,
+            process_images=args.process_images,
+            thumbnail_size=args.thumbnails,
+            transcode=args.transcode,
+            member_output=args.member_output
         )
         
     finally:
+        if profiler:
+            # Closing browsers and Playwright isn't part of saving
+            profiler.start_phase('shutdown')
         driver.quit()
+        close_session_pools()
+        if profiler:
+            profiler.finish()
 
 if __name__ == '__main__':
     main()
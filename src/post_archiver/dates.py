@@ -0,0 +1,93 @@
+"""Approximate post dates for YouTube Community Scraper
+
+YouTube only shows relative timestamps on posts ("3 weeks ago"), so dates are
+approximated by subtracting the stated amount from the current time, taking
+a month as 30 days and a year as 365 days.
+"""
+import re
+from datetime import datetime, timedelta
+
+UNIT_SECONDS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+    'week': 7 * 24 * 60 * 60,
+    'month': 30 * 24 * 60 * 60,
+    'year': 365 * 24 * 60 * 60,
+}
+
+SHORT_UNITS = {'s': 'second', 'h': 'hour', 'd': 'day', 'w': 'week', 'm': 'month', 'y': 'year'}
+
+RELATIVE_RE = re.compile(r'(\d+)\s*(second|minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+SHORT_RE = re.compile(r'^(\d+)\s*([shdwmy])$', re.IGNORECASE)
+
+def parse_relative_time(text, now=None):
+    """Convert a relative timestamp like '3 weeks ago' into an approximate datetime.
+    
+    Returns None if the text contains no relative timestamp.
+    """
+    if not text:
+        return None
+    match = RELATIVE_RE.search(text)
+    if not match:
+        return None
+    amount, unit = int(match.group(1)), match.group(2).lower()
+    return (now or datetime.now()) - timedelta(seconds=amount * UNIT_SECONDS[unit])
+
+def parse_date(value, now=None, end_of_day=False):
+    """Parse a date option: 'YYYY-MM-DD', a short age like '30d', '6m' or '1y', or '3 weeks ago'.
+    
+    With end_of_day=True a plain date means the end of that day, so it can
+    be used as an inclusive upper bound. Raises ValueError if the value can't
+    be parsed.
+    """
+    value = value.strip()
+    match = SHORT_RE.match(value)
+    if match:
+        unit = SHORT_UNITS[match.group(2).lower()]
+        return (now or datetime.now()) - timedelta(seconds=int(match.group(1)) * UNIT_SECONDS[unit])
+    
+    parsed = parse_relative_time(value, now)
+    if parsed:
+        return parsed
+    
+    date = datetime.strptime(value, '%Y-%m-%d')
+    if end_of_day:
+        date += timedelta(days=1) - timedelta(microseconds=1)
+    return date
+
+class DateFilter:
+    """Filter posts by approximate date and tell when the feed has passed `since`.
+    
+    The feed is newest first, apart from a pinned post at the top. Scrolling
+    can stop once `patience` posts in a row are older than `since`, so a
+    single old pinned post doesn't end the scrape early.
+    
+    Posts without a readable timestamp are always accepted.
+    """
+    
+    def __init__(self, since=None, until=None, now=None, patience=2):
+        self.since = since
+        self.until = until
+        self.now = now or datetime.now()
+        self.patience = patience
+        self.older_streak = 0
+    
+    def accept(self, post):
+        """Return whether a post falls in the date range; call once per post in feed order."""
+        posted = parse_relative_time(post.timestamp, self.now)
+        if posted is None:
+            return True
+        
+        if self.since and posted < self.since:
+            self.older_streak += 1
+            return False
+        self.older_streak = 0
+        
+        return not (self.until and posted > self.until)
+    
+    @property
+    def exhausted(self):
+        """True once the feed has scrolled past `since`."""
+        return self.older_streak >= self.patience
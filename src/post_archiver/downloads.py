@@ -0,0 +1,160 @@
+"""Pooled, proxy-aware HTTP downloads for images and other assets
+
+Downloads go through the same proxies as the browser. Each proxy (or the
+direct connection when no proxies are configured) gets one keep-alive
+requests.Session, so repeated downloads from the same CDN host reuse their
+TCP/TLS connections. Concurrent downloads to a single host are capped, and a
+failed download is retried through the next proxy in the rotation.
+"""
+import os
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+PER_HOST_CONNECTIONS = 4
+MAX_RETRIES = 3
+TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+# Status codes worth retrying through another proxy
+RETRY_STATUSES = {403, 408, 429, 500, 502, 503, 504}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+class SessionPool:
+    """One keep-alive requests.Session per proxy, with per-host limits.
+    
+    Args:
+        proxies: Proxy URLs (<scheme>://<user>:<pass>@<host>:<port>); empty
+            or None downloads directly
+        per_host: Maximum concurrent downloads from a single host
+        max_retries: Attempts per download, each through the next proxy
+        timeout: Connect/read timeout in seconds
+    """
+    
+    def __init__(self, proxies=None, per_host=PER_HOST_CONNECTIONS, max_retries=MAX_RETRIES,
+                 timeout=TIMEOUT):
+        self.proxies = list(proxies or []) or [None]
+        self.per_host = per_host
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._sessions = {}
+        self._host_limits = {}
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def _next_proxy(self):
+        with self._lock:
+            proxy = self.proxies[self._next]
+            self._next = (self._next + 1) % len(self.proxies)
+            return proxy
+    
+    def _session(self, proxy):
+        with self._lock:
+            session = self._sessions.get(proxy)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                
+                session = requests.Session()
+                # pool_maxsize is per host; blocking keeps extra threads waiting
+                # for a connection instead of opening throwaway ones
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.per_host, pool_block=True)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if proxy:
+                    session.proxies = {'http': proxy, 'https': proxy}
+                self._sessions[proxy] = session
+            return session
+    
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            limit = self._host_limits.get(host)
+            if limit is None:
+                limit = self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return limit
+    
+    def download(self, url, save_path):
+        """Download url to save_path. Returns True on success."""
+        logger = logging.getLogger('post_archiver')
+        tmp_path = f"{save_path}.part"
+        
+        for attempt in range(1, self.max_retries + 1):
+            proxy = self._next_proxy()
+            via = f" via {urlparse(proxy).hostname}" if proxy else ""
+            try:
+                with self._host_limit(url):
+                    logger.debug(f"Downloading {url}{via} (attempt {attempt})")
+                    with self._session(proxy).get(url, timeout=self.timeout, stream=True) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            raise IOError(f"HTTP {response.status_code}")
+                        response.raise_for_status()
+                        
+                        with open(tmp_path, 'wb') as f:
+                            for chunk in response.iter_content(CHUNK_SIZE):
+                                f.write(chunk)
+                os.replace(tmp_path, save_path)
+                logger.info(f"Downloaded {url} to {save_path}")
+                return True
+            except Exception as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status is not None and status not in RETRY_STATUSES:
+                    logger.error(f"Error downloading image {url}: {str(e)}")
+                    break
+                if attempt < self.max_retries:
+                    logger.warning(f"Download of {url}{via} failed ({str(e)}), retrying with next proxy")
+                    time.sleep(min(2 ** (attempt - 1), 10))
+                else:
+                    logger.error(f"Error downloading image {url}: {str(e)}")
+        
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    
+    def download_many(self, items, max_workers=None):
+        """Download (url, save_path) pairs concurrently.
+        
+        Returns a list of booleans in the same order as items.
+        """
+        items = list(items)
+        if len(items) <= 1:
+            return [self.download(url, path) for url, path in items]
+        
+        max_workers = max_workers or min(len(items), self.per_host * len(self.proxies))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda item: self.download(*item), items))
+    
+    def close(self):
+        """Close every session and its connections."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+def get_session_pool(proxy_manager=None):
+    """Return the shared SessionPool for a proxy manager's proxies.
+    
+    Pools are shared per process and per proxy list, so every download in a
+    run reuses the same connections.
+    """
+    proxies = tuple(proxy_manager.proxies) if proxy_manager else ()
+    with _pools_lock:
+        pool = _pools.get(proxies)
+        if pool is None:
+            pool = _pools[proxies] = SessionPool(proxies)
+        return pool
+
+def close_session_pools():
+    """Close all shared session pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,175 @@
+"""Post-processing of downloaded images
+
+YouTube serves post images as JPEG, PNG, WebP or GIF, but they were all saved
+as .jpg. An ImageProcessor runs after download_post_images, in a process
+pool across all cores, and for each downloaded file:
+
+  - detects the real format and fixes the file extension
+  - records the width, height, format and SHA-256 of the stored file on the
+    post's Image record
+  - optionally writes a thumbnail (<name>_thumb.<ext>)
+  - optionally transcodes to WebP or AVIF, replacing the original file
+
+Together with `-q src` this downloads each image once and derives smaller
+variants locally. Requires Pillow (pip install post-archiver[images]).
+"""
+import os
+import hashlib
+import logging
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+TRANSCODE_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif', 'AVIF': '.avif'}
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _thumbnail_format(image_format, transcode):
+    if transcode:
+        return TRANSCODE_FORMATS[transcode]
+    return image_format if image_format in ('JPEG', 'PNG', 'WEBP') else 'PNG'
+
+def _save(image, path, image_format, quality):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(path, image_format, quality=quality)
+
+def process_file(path, thumbnail_size=None, transcode=None, quality=80):
+    """Process one downloaded image; runs in a worker process.
+    
+    Returns a dict with the stored file's name, format, width, height and
+    sha256, and the thumbnail's name if one was made.
+    """
+    from PIL import Image as PILImage
+    
+    path = Path(path)
+    with PILImage.open(path) as image:
+        # Multi-picture JPEGs are still JPEGs
+        image_format = 'JPEG' if image.format == 'MPO' else image.format
+        width, height = image.size
+        animated = getattr(image, 'is_animated', False)
+        
+        thumbnail = None
+        if thumbnail_size:
+            thumb_format = _thumbnail_format(image_format, transcode)
+            thumbnail = path.with_name(f"{path.stem}_thumb{EXTENSIONS[thumb_format]}")
+            thumb = image.copy()
+            thumb.thumbnail((thumbnail_size, thumbnail_size))
+            _save(thumb, thumbnail, thumb_format, quality)
+        
+        target = path
+        if transcode and not animated and image_format != TRANSCODE_FORMATS[transcode]:
+            image_format = TRANSCODE_FORMATS[transcode]
+            target = path.with_suffix(EXTENSIONS[image_format])
+            _save(image, target, image_format, quality)
+    
+    if target == path and image_format in EXTENSIONS and path.suffix.lower() != EXTENSIONS[image_format]:
+        # Same bytes, honest extension
+        target = path.with_suffix(EXTENSIONS[image_format])
+        os.replace(path, target)
+    elif target != path:
+        os.remove(path)
+    
+    return {
+        'file': target.name,
+        'format': image_format.lower(),
+        'width': width,
+        'height': height,
+        'sha256': _sha256(target),
+        'thumbnail': thumbnail.name if thumbnail else None,
+    }
+
+def check_support(transcode=None):
+    """Raise RuntimeError unless Pillow is installed and can write `transcode`."""
+    try:
+        from PIL import Image as PILImage
+    except ImportError:
+        raise RuntimeError("Image processing requires Pillow (pip install post-archiver[images])")
+    if transcode and transcode not in TRANSCODE_FORMATS:
+        raise ValueError(f"Unknown transcode format: {transcode}")
+    PILImage.init()
+    if transcode and TRANSCODE_FORMATS[transcode] not in PILImage.SAVE:
+        raise RuntimeError(f"This Pillow build can't write {transcode.upper()} images; "
+                           f"upgrade Pillow or use another --transcode format")
+
+class ImageProcessor:
+    """Processes downloaded post images in a process pool.
+    
+    Args:
+        images_dir: Directory the images were downloaded to
+        thumbnail_size: Longest side of thumbnails in pixels, or None for no thumbnails
+        transcode: 'webp', 'avif' or None to keep the original format
+        quality: Encoder quality for thumbnails and transcoded images
+        workers: Worker processes (default: CPU count)
+    """
+    
+    def __init__(self, images_dir, thumbnail_size=None, transcode=None, quality=80, workers=None):
+        check_support(transcode)
+        
+        self.images_dir = Path(images_dir)
+        self.options = {'thumbnail_size': thumbnail_size, 'transcode': transcode, 'quality': quality}
+        # Spawned, not forked, so workers don't inherit the browser's threads
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context('spawn'))
+        self.pending = []
+        self.processed = 0
+        self.failed = 0
+    
+    def submit_post(self, post):
+        """Queue a post's downloaded images for processing."""
+        for image in post.images or []:
+            primary = 'source_file' if image.source_file else 'standard_file'
+            for field in ('source_file', 'standard_file'):
+                name = getattr(image, field)
+                if not name:
+                    continue
+                options = dict(self.options)
+                if field != primary:
+                    # One thumbnail per image, from the best quality file
+                    options['thumbnail_size'] = None
+                future = self.pool.submit(process_file, self.images_dir / name, **options)
+                self.pending.append((post, image, field, future))
+    
+    def wait(self, post=None):
+        """Apply finished results to their Image records.
+        
+        With a post, waits only for that post's images (for streamed output);
+        otherwise waits for everything queued so far.
+        """
+        logger = logging.getLogger('post_archiver')
+        remaining = []
+        for item in self.pending:
+            item_post, image, field, future = item
+            if post is not None and item_post is not post:
+                remaining.append(item)
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to process {getattr(image, field)}: {str(e)}")
+                continue
+            self.processed += 1
+            setattr(image, field, result['file'])
+            # Dimensions and hash describe the best quality file
+            if field == 'source_file' or not image.source_file:
+                image.width = result['width']
+                image.height = result['height']
+                image.format = result['format']
+                image.sha256 = result['sha256']
+                image.thumbnail_file = result['thumbnail']
+        self.pending = remaining
+    
+    def close(self):
+        """Wait for all queued images and shut down the pool."""
+        try:
+            self.wait()
+        finally:
+            self.pool.shutdown()
+        print(f"Processed {self.processed} images" + (f", {self.failed} failed" if self.failed else ""))
@@ -0,0 +1,437 @@
+"""Durable job queue for distributing post enrichment across processes
+
+After post discovery, fetching comments (get_post_comments) and downloading
+images (download_post_images) for each post are independent jobs. They are
+put in a durable queue so any number of worker processes on this machine can
+lease and run them. The coordinator then merges
+the results back into the archive.
+
+JobQueue defines the interface; SQLiteJobQueue is the local implementation.
+Workers hold a lease on a job and renew it with heartbeats. A job whose lease
+expires (for example because the worker died) goes back to other workers, and
+a failed job is retried until it runs out of attempts.
+
+SQLite's write-ahead log needs shared memory, so the queue file must be on a
+local filesystem; workers on other machines need a different JobQueue backend.
+"""
+import os
+import abc
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+class JobQueue(abc.ABC):
+    """Interface for job queue backends."""
+    
+    @abc.abstractmethod
+    def put(self, key, kind, payload, max_attempts=MAX_ATTEMPTS):
+        """Add a job. Returns True if it was added or reset.
+        
+        A job with the same key and payload is kept, so re-running resumes
+        where the last run stopped. A failed job, or one whose payload changed
+        (for example a new images directory), is reset to run again.
+        """
+    
+    @abc.abstractmethod
+    def lease(self, worker_id, lease_seconds=LEASE_SECONDS):
+        """Lease the next runnable job as a dict, or return None."""
+    
+    @abc.abstractmethod
+    def heartbeat(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        """Extend a lease. Returns False if the worker no longer holds it."""
+    
+    @abc.abstractmethod
+    def complete(self, job_id, worker_id, result):
+        """Store a job's result and mark it done."""
+    
+    @abc.abstractmethod
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt; the job is retried while attempts remain."""
+    
+    @abc.abstractmethod
+    def counts(self):
+        """Return a dict of job counts by status."""
+    
+    @abc.abstractmethod
+    def results(self):
+        """Yield (key, kind, payload, result) for every finished job."""
+    
+    @abc.abstractmethod
+    def open_copy(self):
+        """Open another handle on the same queue, e.g. for a heartbeat thread."""
+    
+    def close(self):
+        pass
+    
+    def unfinished(self):
+        counts = self.counts()
+        return counts.get('pending', 0) + counts.get('leased', 0)
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in a SQLite database file."""
+    
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT UNIQUE NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+    
+    def put(self, key, kind, payload, max_attempts=MAX_ATTEMPTS):
+        payload = json.dumps(payload, default=str, sort_keys=True)
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (key, kind, payload, max_attempts, updated) VALUES (?, ?, ?, ?, ?)",
+            (key, kind, payload, max_attempts, now)
+        )
+        if cursor.rowcount == 1:
+            return True
+        # Jobs with a live lease are left to their worker
+        cursor = self.conn.execute(
+            "UPDATE jobs SET kind = ?, payload = ?, status = 'pending', attempts = 0, max_attempts = ?, "
+            "lease_owner = NULL, lease_expires = NULL, result = NULL, error = NULL, updated = ? "
+            "WHERE key = ? AND (status = 'failed' OR payload != ?) "
+            "AND NOT (status = 'leased' AND lease_expires >= ?)",
+            (kind, payload, max_attempts, now, key, payload, now)
+        )
+        return cursor.rowcount == 1
+    
+    def lease(self, worker_id, lease_seconds=LEASE_SECONDS):
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Leases that expired on their last attempt are given up on
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = self.conn.execute(
+                "SELECT id, key, kind, payload, attempts FROM jobs "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row[0])
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        
+        return {
+            'id': row[0],
+            'key': row[1],
+            'kind': row[2],
+            'payload': json.loads(row[3]),
+            'attempt': row[4] + 1,
+        }
+    
+    def heartbeat(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def complete(self, job_id, worker_id, result):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result), time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def fail(self, job_id, worker_id, error):
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+            "error = ?, lease_owner = NULL, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (str(error), time.time(), job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+    
+    def counts(self):
+        now = time.time()
+        counts = {}
+        for status, expired, count in self.conn.execute(
+            "SELECT status, status = 'leased' AND lease_expires < ? AND attempts >= max_attempts, COUNT(*) "
+            "FROM jobs GROUP BY 1, 2", (now,)
+        ):
+            # Count dead leases on their last attempt as failed already
+            status = 'failed' if expired else status
+            counts[status] = counts.get(status, 0) + count
+        return counts
+    
+    def results(self):
+        for key, kind, payload, result in self.conn.execute(
+            "SELECT key, kind, payload, result FROM jobs WHERE status = 'done' ORDER BY id"
+        ):
+            yield key, kind, json.loads(payload), json.loads(result)
+    
+    def open_copy(self):
+        return SQLiteJobQueue(self.path)
+    
+    def close(self):
+        self.conn.close()
+
+def open_queue(location):
+    """Open a job queue from a location string.
+    
+    Only SQLite files are supported (``path`` or ``sqlite:///path``); other
+    backends can implement JobQueue and be added here.
+    """
+    location = str(location)
+    if location.startswith('sqlite:///'):
+        location = location[len('sqlite:///'):]
+    elif '://' in location:
+        raise ValueError(f"Unsupported job queue backend: {location}")
+    return SQLiteJobQueue(location)
+
+def _heartbeat_loop(queue, job_id, worker_id, lease_seconds, stop):
+    heartbeat_queue = queue.open_copy()
+    try:
+        while not stop.wait(lease_seconds / 3):
+            if not heartbeat_queue.heartbeat(job_id, worker_id, lease_seconds):
+                break
+    finally:
+        heartbeat_queue.close()
+
+class _Worker:
+    """Runs leased jobs, keeping one browser per browser/session setting."""
+    
+    def __init__(self):
+        self.driver = None
+        self.driver_key = None
+    
+    def get_driver(self, options):
+        from .browser import create_driver
+        from .proxy import ProxyManager
+        
+        key = json.dumps(options, sort_keys=True)
+        if self.driver is None or self.driver_key != key:
+            self.close()
+            options = dict(options)
+            proxies = options.pop('proxies', None)
+            proxy_manager = ProxyManager(proxies=proxies) if proxies else None
+            self.driver = create_driver(proxy_manager=proxy_manager, **options)
+            self.driver.proxy_manager = proxy_manager
+            self.driver_key = key
+        return self.driver
+    
+    def run(self, job):
+        from .proxy import ProxyManager
+        from .scraper import _load_post_comments, download_post_images
+        
+        payload = job['payload']
+        if job['kind'] == 'comments':
+            driver = self.get_driver(payload['driver'])
+            snapshot_store = None
+            if payload.get('snapshot_dir'):
+                from .snapshots import SnapshotStore
+                snapshot_store = SnapshotStore(payload['snapshot_dir'], channel=payload.get('channel'))
+            # No retries here: a failure fails the job, which the queue retries
+            # with a fresh browser
+            comments = _load_post_comments(payload['post_url'], driver, snapshot_store)
+            return [comment.to_dict() for comment in comments]
+        
+        if job['kind'] == 'images':
+            images = download_post_images(
+                payload,
+                Path(payload['images_dir']),
+                payload['post_index'],
+                payload['image_quality'],
+                proxy_manager=ProxyManager(proxies=payload['proxies']) if payload.get('proxies') else None
+            )
+            return [image.to_dict() for image in images]
+        
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+    
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+def run_worker(location, worker_id=None, idle_timeout=30, lease_seconds=LEASE_SECONDS, poll_interval=2):
+    """Lease and run jobs until the queue has been idle for idle_timeout seconds.
+    
+    Returns the number of jobs completed by this worker.
+    """
+    logger = logging.getLogger('post_archiver')
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    queue = open_queue(location)
+    worker = _Worker()
+    completed = 0
+    idle_since = time.monotonic()
+    
+    try:
+        while True:
+            job = queue.lease(worker_id, lease_seconds)
+            if job is None:
+                if time.monotonic() - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            
+            logger.info(f"Worker {worker_id} running {job['key']} (attempt {job['attempt']})")
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=_heartbeat_loop,
+                args=(queue, job['id'], worker_id, lease_seconds, stop),
+                daemon=True
+            )
+            heartbeat.start()
+            try:
+                result = worker.run(job)
+            except Exception as e:
+                logger.error(f"Job {job['key']} failed: {str(e)}")
+                queue.fail(job['id'], worker_id, e)
+                # Start over with a fresh browser for the next job
+                worker.close()
+            else:
+                if queue.complete(job['id'], worker_id, result):
+                    completed += 1
+                else:
+                    logger.warning(f"Lost lease on {job['key']}, result discarded")
+            finally:
+                stop.set()
+                heartbeat.join()
+            idle_since = time.monotonic()
+    finally:
+        worker.close()
+        queue.close()
+    
+    logger.info(f"Worker {worker_id} finished after {completed} jobs")
+    return completed
+
+def _start_workers(location, count, idle_timeout):
+    import multiprocessing
+    
+    # Spawn rather than fork: the coordinator has a live Playwright connection
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for _ in range(count):
+        process = context.Process(target=run_worker, args=(str(location),),
+                                  kwargs={'idle_timeout': idle_timeout})
+        process.start()
+        processes.append(process)
+    return processes
+
+def enqueue_post_jobs(queue, posts, get_comments=False, download_images=False, images_dir=None,
+                      image_quality='all', driver_options=None, snapshot_store=None):
+    """Add comment and image jobs for a list of posts; returns the number added."""
+    added = 0
+    for index, post in enumerate(posts, 1):
+        if get_comments and post.post_url:
+            added += queue.put(f"comments:{post.post_url}", 'comments', {
+                'post_url': post.post_url,
+                'driver': driver_options or {},
+                'snapshot_dir': str(snapshot_store.root.resolve()) if snapshot_store else None,
+                'channel': snapshot_store.channel if snapshot_store else None,
+            })
+        if download_images and post.images and images_dir:
+            added += queue.put(f"images:{post.post_url}", 'images', {
+                'images': [image.to_dict() for image in post.images],
+                'images_dir': str(Path(images_dir).resolve()),
+                'post_index': index,
+                'image_quality': image_quality,
+                'proxies': (driver_options or {}).get('proxies'),
+            })
+    return added
+
+def apply_job_results(queue, posts, get_comments=False):
+    """Merge finished job results into their posts.
+    
+    With get_comments, posts whose comment job failed or never ran get an
+    empty comment list, as they would when comments are collected inline.
+    """
+    from .models import Comment, Image
+    
+    by_url = {post.post_url: post for post in posts if post.post_url}
+    for key, kind, payload, result in queue.results():
+        post = by_url.get(key.split(':', 1)[1])
+        if post is None:
+            continue
+        if kind == 'comments':
+            post.comments = [Comment(**comment) for comment in result]
+        elif kind == 'images':
+            post.images = [Image(**image) for image in result]
+    
+    if get_comments:
+        for post in posts:
+            if post.comments is None:
+                post.comments = []
+
+def run_distributed_enrichment(location, posts, get_comments=False, download_images=False,
+                               images_dir=None, image_quality='all', driver_options=None,
+                               workers=1, poll_interval=5, snapshot_store=None):
+    """Enqueue enrichment jobs, run local workers, and merge the results.
+    
+    With workers=0 no local workers are started and this waits for external
+    `post-archiver worker` processes to drain the queue.
+    """
+    logger = logging.getLogger('post_archiver')
+    queue = open_queue(location)
+    try:
+        added = enqueue_post_jobs(queue, posts, get_comments, download_images, images_dir,
+                                  image_quality, driver_options, snapshot_store)
+        print(f"\nQueued {added} jobs in {location}")
+        
+        processes = _start_workers(location, workers, idle_timeout=poll_interval * 2) if workers else []
+        restarts = 0
+        while queue.unfinished():
+            time.sleep(poll_interval)
+            counts = queue.counts()
+            print(f"Jobs: {counts.get('done', 0)} done, {counts.get('pending', 0)} pending, "
+                  f"{counts.get('leased', 0)} running, {counts.get('failed', 0)} failed")
+            
+            # Replace local workers that exited while work remains
+            if processes and not any(p.is_alive() for p in processes) and queue.unfinished():
+                if restarts >= MAX_ATTEMPTS:
+                    logger.error("Local workers keep exiting, giving up on remaining jobs")
+                    break
+                restarts += 1
+                processes = _start_workers(location, workers, idle_timeout=poll_interval * 2)
+        
+        for process in processes:
+            process.join()
+        
+        apply_job_results(queue, posts, get_comments)
+        failed = queue.counts().get('failed', 0)
+        if failed:
+            print(f"{failed} jobs failed; see the error column in {location}")
+    finally:
+        queue.close()
@@ -0,0 +1,138 @@
+"""Compact record types for scraped posts, comments and images
+
+Records use __slots__ instead of per-instance dicts, and strings that repeat
+across thousands of comments (commenter names, icon URLs, relative
+timestamps) are interned on assignment so each distinct value is stored once,
+whether it is passed to the constructor or set later by the parser. Records also
+support dict-style access (``post['content']``, ``post.get('comments')``) so
+code written against the old plain-dict output keeps working.
+"""
+import sys
+
+def _intern(value):
+    """Intern a string so repeated values share one object."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class _Record:
+    __slots__ = ()
+    
+    # Fields left out of the exported dict when they are None
+    _optional = ()
+    # Fields whose string values are interned whenever they are assigned
+    _interned = ()
+    
+    def __setattr__(self, name, value):
+        if name in self._interned:
+            value = _intern(value)
+        object.__setattr__(self, name, value)
+    
+    def to_dict(self):
+        """Convert the record to a plain dict in output field order."""
+        data = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is None and field in self._optional:
+                continue
+            data[field] = value
+        return data
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None and key in self._optional:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __contains__(self, key):
+        return key in self.__slots__ and not (key in self._optional and getattr(self, key) is None)
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+    
+    def __setstate__(self, state):
+        # Fields added after a record was pickled default to None
+        state = tuple(state) + (None,) * (len(self.__slots__) - len(state))
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+    
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+    
+    def __repr__(self):
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Image(_Record):
+    """An image attached to a post.
+    
+    The *_file fields name downloaded files in the images directory; width,
+    height, format and sha256 are filled in by imageproc.ImageProcessor.
+    """
+    __slots__ = ('standard', 'source', 'standard_file', 'source_file', 'thumbnail_file',
+                 'width', 'height', 'format', 'sha256')
+    _optional = __slots__
+    
+    def __init__(self, standard=None, source=None, standard_file=None, source_file=None,
+                 thumbnail_file=None, width=None, height=None, format=None, sha256=None):
+        self.standard = standard
+        self.source = source
+        self.standard_file = standard_file
+        self.source_file = source_file
+        self.thumbnail_file = thumbnail_file
+        self.width = width
+        self.height = height
+        self.format = format
+        self.sha256 = sha256
+
+class Comment(_Record):
+    """A top-level comment on a post."""
+    __slots__ = ('commenter_name', 'timestamp', 'content', 'like_count', 'commenter_icon',
+                 'commenter_avatar_id')
+    _optional = ('commenter_icon', 'commenter_avatar_id')
+    _interned = ('commenter_name', 'timestamp', 'like_count', 'commenter_icon', 'commenter_avatar_id')
+    
+    def __init__(self, commenter_name='', timestamp='', content='', like_count='0',
+                 commenter_icon=None, commenter_avatar_id=None):
+        self.commenter_name = commenter_name
+        self.timestamp = timestamp
+        self.content = content
+        self.like_count = like_count
+        self.commenter_icon = commenter_icon
+        self.commenter_avatar_id = commenter_avatar_id
+
+class Post(_Record):
+    """A community post and its collected images and comments."""
+    __slots__ = ('post_url', 'timestamp', 'content', 'member_only', 'links', 'images',
+                 'like_count', 'comment_count', 'comments')
+    _optional = ('post_url', 'timestamp', 'comments')
+    _interned = ('timestamp', 'like_count', 'comment_count')
+    
+    def __init__(self, post_url=None, timestamp=None, content=None, member_only=False,
+                 links=None, images=None, like_count='0', comment_count='0', comments=None):
+        self.post_url = post_url
+        self.timestamp = timestamp
+        self.content = content
+        self.member_only = member_only
+        self.links = links if links is not None else []
+        self.images = images if images is not None else []
+        self.like_count = like_count
+        self.comment_count = comment_count
+        self.comments = comments
+
+def json_default(obj):
+    """``json.dump`` hook that serializes records as dicts."""
+    if isinstance(obj, _Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
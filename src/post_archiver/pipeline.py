@@ -0,0 +1,295 @@
+"""Pipelined harvesting for YouTube Community Scraper
+
+The default get_all_posts flow runs in phases: scroll the whole feed, then
+collect images, then fetch comments and download images one post at a time.
+The pipeline overlaps these stages:
+
+  browser   (main thread)  scrolls and ships raw post thread HTML
+  parse     (process pool) turns thread HTML into Post records
+  dispatch  (thread)       drops duplicates and filtered posts, applies max_posts
+  enrich    (threads)      downloads images and fetches comments per post, each
+                           thread with its own browser
+  collect   (thread)       hands finished posts back in feed order
+
+Stages are connected by bounded queues, so a slow stage applies backpressure
+to the ones before it. Total time is then close to the slowest stage rather
+than the sum of all stages.
+"""
+import os
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_DONE = None
+
+HEIGHT_SCRIPT = "document.documentElement.scrollHeight"
+# The thread's timestamp link, from which parse_post_thread reads the post URL
+POST_LINK_SELECTOR = "div > ytd-backstage-post-renderer > div > div > div > div > yt-formatted-string > a[href]"
+# Threads without their post link haven't rendered yet; they are left
+# unshipped (null) and read again after the next scroll
+SHIP_SCRIPT = """(element, link) => {
+    if (!element.querySelector(link)) return null;
+    element.setAttribute('data-pa-shipped', '');
+    return element.outerHTML;
+}"""
+# Also empties the shipped thread so the page's DOM doesn't grow for the whole run
+SHIP_AND_PRUNE_SCRIPT = """(element, link) => {
+    if (!element.querySelector(link)) return null;
+    element.setAttribute('data-pa-shipped', '');
+    const html = element.outerHTML;
+    element.replaceChildren();
+    return html;
+}"""
+UNSHIPPED_SELECTOR = "ytd-backstage-post-thread-renderer:not([data-pa-shipped])"
+
+def _parse_payload(thread_html, get_images, image_quality):
+    """Parse stage; runs in a worker process."""
+    from .scraper import parse_post_thread, parse_post_images
+    
+    post = parse_post_thread(thread_html)
+    if get_images:
+        post.images = parse_post_images(thread_html, image_quality)
+    return post
+
+def _scroll_and_ship(driver, parse_pool, parsed, stop, get_images, image_quality, trace,
+                     snapshot_store=None, prune_dom=False):
+    """Browser stage: scroll the feed and submit each new thread for parsing."""
+    from .scrolling import get_scroll_strategy
+    
+    logger = logging.getLogger('post_archiver')
+    no_new_posts_count = 0
+    scroll = get_scroll_strategy(driver, 'posts')
+    last_height = driver.evaluate(HEIGHT_SCRIPT)
+    ship_script = SHIP_AND_PRUNE_SCRIPT if prune_dom else SHIP_SCRIPT
+    
+    try:
+        while not stop.is_set():
+            shipped = 0
+            for thread in driver.query_selector_all(UNSHIPPED_SELECTOR):
+                if stop.is_set():
+                    break
+                if get_images:
+                    # Images are lazy-loaded, bring the post into view first
+                    thread.scroll_into_view_if_needed()
+                    driver.wait_for_timeout(500)
+                thread_html = thread.evaluate(ship_script, POST_LINK_SELECTOR)
+                if thread_html is None:
+                    continue
+                shipped += 1
+                # Blocks while the parse stage is behind
+                parsed.put((parse_pool.submit(_parse_payload, thread_html, get_images, image_quality),
+                            thread_html if snapshot_store else None))
+            
+            if scroll.scrolls:
+                scroll.record(shipped)
+            new_height = scroll.advance(driver)
+            no_new_posts_count = 0 if shipped else no_new_posts_count + 1
+            if new_height == last_height and not scroll.moved and no_new_posts_count >= 3:
+                break
+            last_height = new_height
+            if trace:
+                logger.debug(f"Shipped {shipped} threads, height {new_height}")
+    finally:
+        parsed.put(_DONE)
+
+def _dispatch(parsed, enrich_queue, stop, enrich_workers, member_only, max_posts, verbose,
+              snapshot_store=None, date_filter=None):
+    """Dispatch stage: filter parsed posts and hand them to the enrichers."""
+    logger = logging.getLogger('post_archiver')
+    posts_seen = set()
+    accepted = 0
+    
+    try:
+        while True:
+            item = parsed.get()
+            if item is _DONE:
+                break
+            if stop.is_set():
+                continue  # Keep draining so the browser stage never blocks
+            
+            future, thread_html = item
+            try:
+                post = future.result()
+            except Exception as e:
+                logger.error(f"Failed to parse post: {str(e)}")
+                continue
+            
+            if member_only and not post.member_only:
+                continue
+            if not post.post_url or post.post_url in posts_seen:
+                continue
+            
+            posts_seen.add(post.post_url)
+            
+            if date_filter and not date_filter.accept(post):
+                if date_filter.exhausted:
+                    print(f"\nReached posts older than {date_filter.since:%Y-%m-%d}")
+                    stop.set()
+                continue
+            # Only accepted posts are snapshotted, so reextract rebuilds the same set
+            if snapshot_store:
+                snapshot_store.put('post', post.post_url, thread_html)
+            if verbose:
+                print(f"Found post: {post.timestamp} ({post.post_url})")
+            
+            # Blocks while the enrichers are behind
+            accepted += 1
+            enrich_queue.put((accepted, post))
+            
+            if accepted >= max_posts:
+                print(f"\nReached requested amount of {max_posts} posts")
+                stop.set()
+    finally:
+        for _ in range(enrich_workers):
+            enrich_queue.put(_DONE)
+
+def _enrich(enrich_queue, results, abort, proxy_manager, driver_options, get_comments,
+            download_images, images_dir, image_quality, snapshot_store=None):
+    """Enrich stage: download images and fetch comments, one browser per thread.
+    
+    Every accepted post is finished even after scrolling stops; posts are only
+    skipped once another stage has failed and the run is aborted.
+    """
+    logger = logging.getLogger('post_archiver')
+    comments_driver = None
+    
+    try:
+        from .browser import create_driver
+        from .scraper import get_post_comments, download_post_images
+        
+        while True:
+            item = enrich_queue.get()
+            if item is _DONE:
+                break
+            
+            if abort.is_set():
+                continue  # Keep draining so the dispatch stage never blocks
+            
+            index, post = item
+            try:
+                if download_images and post.images and images_dir:
+                    post.images = download_post_images(post, images_dir, index, image_quality, proxy_manager)
+                
+                if get_comments:
+                    # Playwright objects belong to the thread that created them
+                    if comments_driver is None:
+                        comments_driver = create_driver(proxy_manager, **driver_options)
+                    post.comments = get_post_comments(
+                        post_url=post.post_url,
+                        driver=comments_driver,
+                        proxy_manager=proxy_manager,
+                        snapshot_store=snapshot_store
+                    )
+            except Exception as e:
+                logger.error(f"Failed to enrich {post.post_url}: {str(e)}")
+            
+            results.put((index, post))
+    finally:
+        if comments_driver is not None:
+            comments_driver.quit()
+        results.put(_DONE)
+
+def _run_stage(target, args, errors, stop, abort, inbox=None):
+    """Run a stage thread, recording its exception and aborting the pipeline.
+    
+    After a failure the stage keeps draining its input queue until the
+    previous stage is done, so no stage blocks on a full queue.
+    """
+    try:
+        target(*args)
+    except BaseException as e:
+        logging.getLogger('post_archiver').error(
+            f"Pipeline stage {threading.current_thread().name} failed: {str(e)}")
+        errors.append(e)
+        abort.set()
+        stop.set()
+        while inbox is not None and inbox.get() is not _DONE:
+            pass
+
+def _collect(results, enrich_workers, on_post):
+    """Collect stage: pass finished posts to on_post in feed order."""
+    pending = {}
+    next_index = 1
+    remaining = enrich_workers
+    
+    while remaining:
+        item = results.get()
+        if item is _DONE:
+            remaining -= 1
+            continue
+        index, post = item
+        pending[index] = post
+        while next_index in pending:
+            on_post(pending.pop(next_index))
+            next_index += 1
+
+def run_pipeline(driver, proxy_manager, on_post, get_comments=False, get_images=False,
+                 download_images=False, images_dir=None, image_quality='all',
+                 verbose=False, trace=False, max_posts=float('inf'), member_only=False,
+                 parse_workers=None, enrich_workers=2, snapshot_store=None, date_filter=None,
+                 prune_dom=False):
+    """Harvest posts with overlapping scroll, parse and enrichment stages.
+    
+    Args:
+        driver: Browser page already showing the channel's posts tab
+        on_post: Called with each finished post, in feed order
+        parse_workers: Parser processes (default: CPU count)
+        enrich_workers: Enrichment threads, each with its own browser for comments
+        snapshot_store: Optional SnapshotStore for the raw post and comment HTML
+        date_filter: Optional dates.DateFilter; scrolling stops once it is exhausted
+        prune_dom: Empty post threads in the page once shipped, keeping browser memory flat
+        
+    Other arguments match get_all_posts.
+    """
+    parse_workers = parse_workers or os.cpu_count() or 1
+    enrich_workers = max(1, enrich_workers)
+    
+    parsed = queue.Queue(maxsize=parse_workers * 4)
+    enrich_queue = queue.Queue(maxsize=enrich_workers * 2)
+    results = queue.Queue()
+    # stop ends scrolling and dispatching once enough posts are accepted;
+    # abort also makes the enrichers skip queued posts after a stage fails
+    stop = threading.Event()
+    abort = threading.Event()
+    
+    # Exceptions raised by the stage threads, re-raised once all have stopped
+    errors = []
+    
+    driver_options = getattr(driver, 'driver_options', {})
+    
+    threads = [
+        threading.Thread(target=_run_stage, name='dispatch',
+                         args=(_dispatch, (parsed, enrich_queue, stop, enrich_workers, member_only, max_posts,
+                                           verbose, snapshot_store, date_filter), errors, stop, abort, parsed)),
+        # The results queue is unbounded, so nothing needs draining after a failure
+        threading.Thread(target=_run_stage, name='collect',
+                         args=(_collect, (results, enrich_workers, on_post), errors, stop, abort)),
+    ]
+    threads += [
+        threading.Thread(target=_run_stage, name=f'enrich-{i}',
+                         args=(_enrich, (enrich_queue, results, abort, proxy_manager, driver_options, get_comments,
+                                         download_images, images_dir, image_quality, snapshot_store),
+                               errors, stop, abort, enrich_queue))
+        for i in range(enrich_workers)
+    ]
+    
+    # Spawn rather than fork: this process has a live Playwright connection
+    with ProcessPoolExecutor(max_workers=parse_workers,
+                             mp_context=multiprocessing.get_context('spawn')) as parse_pool:
+        for thread in threads:
+            thread.start()
+        try:
+            _scroll_and_ship(driver, parse_pool, parsed, stop, get_images, image_quality, trace,
+                             snapshot_store, prune_dom)
+        except BaseException:
+            abort.set()
+            stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+    
+    if errors:
+        raise errors[0]
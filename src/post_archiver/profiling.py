@@ -0,0 +1,121 @@
+"""Per-run profiling for YouTube Community Scraper
+
+A Profiler records each phase of a run (channel info, scrolling, images,
+comments and downloads, saving, shutdown) with a Python profiler and writes,
+to one directory:
+
+    NN_<phase>.prof   cProfile stats, open with `python -m pstats` or snakeviz
+    NN_<phase>.html   pyinstrument report (with --profiler pyinstrument)
+    trace_*.zip       Playwright traces, with --profile-browser; open with
+                      `playwright show-trace`
+    summary.txt       wall time per phase and the hottest functions
+
+Python profilers only see the thread that runs the phase, so work done in
+pipeline threads and worker processes is not included; Playwright traces
+cover every browser context.
+"""
+import io
+import time
+import pstats
+import cProfile
+import logging
+from pathlib import Path
+
+def _pyinstrument_hot(session, top):
+    """List the top functions by own time in a pyinstrument session."""
+    totals = {}
+    stack = [session.root_frame()] if session else []
+    while stack:
+        frame = stack.pop()
+        if frame is None:
+            continue
+        own = frame.time
+        for child in frame.children:
+            if getattr(child, 'identifier', None) == '[self]':
+                continue  # Self time marker, counted as part of this frame
+            own -= child.time
+            stack.append(child)
+        key = f"{frame.function} ({frame.file_path_short}:{frame.line_no})"
+        totals[key] = totals.get(key, 0) + own
+    
+    lines = [f"{'own time':>10}  function"]
+    for key, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{seconds:9.3f}s  {key}")
+    return '\n'.join(lines)
+
+class Profiler:
+    """Profile the phases of one run into a directory.
+    
+    Args:
+        output_dir: Directory for the profile files and summary
+        engine: 'cprofile' (deterministic, stdlib) or 'pyinstrument' (sampling, optional dependency)
+        top: Number of hot functions listed per phase in the summary
+    """
+    
+    def __init__(self, output_dir, engine='cprofile', top=20):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.engine = engine
+        self.top = top
+        self.phases = []
+        self._current = None
+        
+        if engine == 'pyinstrument':
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                raise RuntimeError("--profiler pyinstrument requires pyinstrument (pip install pyinstrument)")
+        elif engine != 'cprofile':
+            raise ValueError(f"Unknown profiler: {engine}")
+    
+    def start_phase(self, name):
+        """Start profiling a phase, ending the current one."""
+        self.end_phase()
+        if self.engine == 'pyinstrument':
+            from pyinstrument import Profiler as SamplingProfiler
+            profiler = SamplingProfiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        self._current = (name, profiler, time.perf_counter())
+    
+    def end_phase(self):
+        """Stop profiling the current phase and write its profile file."""
+        if self._current is None:
+            return
+        name, profiler, started = self._current
+        self._current = None
+        elapsed = time.perf_counter() - started
+        base = self.output_dir / f"{len(self.phases) + 1:02d}_{name}"
+        
+        if self.engine == 'pyinstrument':
+            profiler.stop()
+            path = base.with_suffix('.html')
+            path.write_text(profiler.output_html(), encoding='utf-8')
+            hot = _pyinstrument_hot(profiler.last_session, self.top)
+        else:
+            profiler.disable()
+            path = base.with_suffix('.prof')
+            profiler.dump_stats(str(path))
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.strip_dirs().sort_stats('tottime').print_stats(self.top)
+            hot = stream.getvalue()
+        
+        self.phases.append({'name': name, 'seconds': elapsed, 'file': path.name, 'hot': hot})
+        logging.getLogger('post_archiver').debug(f"Profiled phase {name} in {elapsed:.2f}s to {path}")
+    
+    def finish(self):
+        """End the current phase and write summary.txt."""
+        self.end_phase()
+        total = sum(phase['seconds'] for phase in self.phases) or 1
+        lines = ['Phases (wall time)', '']
+        for phase in self.phases:
+            lines.append(f"  {phase['name']:<12} {phase['seconds']:9.2f}s {phase['seconds'] / total:6.1%}  {phase['file']}")
+        for phase in self.phases:
+            lines += ['', '=' * 78, f"Hot functions: {phase['name']}", '=' * 78, phase['hot'].rstrip()]
+        
+        summary = self.output_dir / 'summary.txt'
+        summary.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        print(f"\nWrote profile summary to {summary}")
@@ -1,11 +1,13 @@
 """Proxy management functionality for YouTube Community Scraper"""
 
 class ProxyManager:
-    def __init__(self, proxy_file=None, single_proxy=None):
+    def __init__(self, proxy_file=None, single_proxy=None, proxies=None):
         self.current_index = 0
         self.proxies = []
         
-        if proxy_file:
+        if proxies:
+            self.proxies = list(proxies)
+        elif proxy_file:
             with open(proxy_file) as f:
                 self.proxies = [line.strip() for line in f if line.strip()]
         elif single_proxy:
@@ -1,107 +1,141 @@
 """Core scraping functionality for YouTube Community Posts"""
-import json
 import time
 import logging
-import requests
 from datetime import datetime
 from urllib.parse import urljoin
 from pathlib import Path
 
 from bs4 import BeautifulSoup
-from playwright.sync_api import expect
 
 from .browser import create_driver
-from .utils import create_directories, download_image
+from .channels import get_channel_metadata, normalize_channel_url
+from .dates import DateFilter
+from .models import Post, Comment, Image
+from .scrolling import get_scroll_strategy
+from .downloads import get_session_pool
+from .utils import create_directories
+from .writer import ArchiveWriter, MemberArchiveWriter, write_archive, write_member_archives
 
-def get_post_comments(post_url, driver, proxy_manager, max_retries=3):
-    """Get all comments for a specific post with retry logic."""
-    browser_type = getattr(driver, 'browser_type', 'chromium')  # Get browser type or default to chromium
+def parse_comments(html):
+    """Parse basic comment data from a post page's HTML."""
+    soup = BeautifulSoup(html, 'html.parser')
+    comments = []
     
-    for attempt in range(max_retries):
-        try:
-            # Create a new driver with next proxy if this is a retry
-            if attempt > 0:
-                try:
-                    driver.quit()
-                except:
-                    pass
-                driver = create_driver(proxy_manager, browser_type=browser_type)
-            
-            driver.goto(post_url)
-            driver.wait_for_timeout(2000)  # Wait for initial load
-            
-            comments = []
-            
-            # First pass - scroll and collect basic comment data
-            last_height = driver.evaluate("document.documentElement.scrollHeight")
-            while True:
-                driver.evaluate("window.scrollTo(0, document.documentElement.scrollHeight)")
-                driver.wait_for_timeout(2000)
-                
-                new_height = driver.evaluate("document.documentElement.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
-            
-            # Parse basic comment data
-            soup = BeautifulSoup(driver.content(), 'html.parser')
-            comment_threads = soup.find_all('ytd-comment-thread-renderer')
+    for thread in soup.find_all('ytd-comment-thread-renderer'):
+        # Get commenter name
+        name_elem = thread.select_one('div > div > div > h3 > a > span')
+        
+        # Get comment timestamp
+        timestamp_elem = thread.select_one('div > div > div > div > span > a')
+        
+        # Get comment content
+        content_elem = thread.select_one('div > div > ytd-expander > div > yt-attributed-string')
+        
+        # Get like count
+        like_elem = thread.select_one('div > div > ytd-comment-engagement-bar > div > span')
+        
+        comments.append(Comment(
+            commenter_name=name_elem.get_text().strip() if name_elem else '',
+            timestamp=timestamp_elem.get_text().strip() if timestamp_elem else '',
+            content=content_elem.get_text().strip() if content_elem else '',
+            like_count=like_elem.get_text().strip() if like_elem else '0'
+        ))
+    
+    return comments
+
+def parse_comment_icons(html, comments):
+    """Fill in commenter icons from a post page's HTML with loaded images."""
+    soup = BeautifulSoup(html, 'html.parser')
+    comment_threads = soup.find_all('ytd-comment-thread-renderer')
+    
+    for i, thread in enumerate(comment_threads):
+        if i >= len(comments):  # Safety check
+            break
             
-            for thread in comment_threads:
-                comment_data = {}
-                
-                # Get commenter name
-                name_elem = thread.select_one('div > div > div > h3 > a > span')
-                comment_data['commenter_name'] = name_elem.get_text().strip() if name_elem else ''
-                
-                # Get comment timestamp
-                timestamp_elem = thread.select_one('div > div > div > div > span > a')
-                comment_data['timestamp'] = timestamp_elem.get_text().strip() if timestamp_elem else ''
-                
-                # Get comment content
-                content_elem = thread.select_one('div > div > ytd-expander > div > yt-attributed-string')
-                comment_data['content'] = content_elem.get_text().strip() if content_elem else ''
+        icon_elem = thread.select_one('ytd-comment-view-model > div > div > a > yt-img-shadow > img')
+        if icon_elem and icon_elem.has_attr('src'):
+            icon_url = icon_elem['src']
+            if icon_url.startswith('//'):
+                icon_url = f'https:{icon_url}'
+            comments[i].commenter_icon = icon_url
+    
+    return comments
+
+COMMENT_COUNT_SCRIPT = "document.querySelectorAll('ytd-comment-thread-renderer').length"
+
+def _load_post_comments(post_url, driver, snapshot_store=None):
+    """Load a post page in driver and collect its comments (a single attempt)."""
+    driver.goto(post_url)
+    driver.wait_for_timeout(2000)  # Wait for initial load
+    
+    # First pass - scroll and collect basic comment data
+    scroll = get_scroll_strategy(driver, 'comments')
+    last_height = driver.evaluate("document.documentElement.scrollHeight")
+    last_count = driver.evaluate(COMMENT_COUNT_SCRIPT)
+    while True:
+        new_height = scroll.advance(driver)
+        count = driver.evaluate(COMMENT_COUNT_SCRIPT)
+        scroll.record(count - last_count)
+        last_count = count
+        if new_height == last_height and not scroll.moved:
+            break
+        last_height = new_height
+    
+    # Parse basic comment data
+    comments = parse_comments(driver.content())
+    
+    # Second pass - scroll back up and collect commenter icons
+    print("Collecting commenter icons...")
+    driver.evaluate("window.scrollTo(0, 0)")
+    driver.wait_for_timeout(2000)  # Wait for images to start loading
+    
+    # Scroll slowly to load all images
+    for i in range(0, last_height, 500):  # Scroll in smaller increments
+        driver.evaluate(f"window.scrollTo(0, {i})")
+        driver.wait_for_timeout(500)  # Small delay between scrolls
+    
+    # Update comments with icons from the HTML with loaded images
+    page_html = driver.content()
+    parse_comment_icons(page_html, comments)
+    if snapshot_store:
+        snapshot_store.put('comments', post_url, page_html)
+    
+    return comments
+
+def get_post_comments(post_url, driver, proxy_manager, max_retries=3, snapshot_store=None):
+    """Get all comments for a specific post with retry logic.
+    
+    Retries run in a separate browser with the next proxy, which is always
+    closed again; the caller's driver stays open and owned by the caller.
+    If snapshot_store is given, the post page's HTML is saved to it.
+    """
+    # Retry with the same browser, cookies and HAR settings as the original driver
+    driver_options = getattr(driver, 'driver_options', {})
+    retry_driver = None
+    
+    try:
+        for attempt in range(max_retries):
+            try:
+                if attempt > 0:
+                    if retry_driver is not None:
+                        retry_driver.quit()
+                        retry_driver = None
+                    retry_driver = create_driver(proxy_manager, **driver_options)
                 
-                # Get like count
-                like_elem = thread.select_one('div > div > ytd-comment-engagement-bar > div > span')
-                comment_data['like_count'] = like_elem.get_text().strip() if like_elem else '0'
+                return _load_post_comments(post_url, retry_driver or driver, snapshot_store)
                 
-                comments.append(comment_data)
-            
-            # Second pass - scroll back up and collect commenter icons
-            print("Collecting commenter icons...")
-            driver.evaluate("window.scrollTo(0, 0)")
-            driver.wait_for_timeout(2000)  # Wait for images to start loading
-            
-            # Scroll slowly to load all images
-            for i in range(0, last_height, 500):  # Scroll in smaller increments
-                driver.evaluate(f"window.scrollTo(0, {i})")
-                driver.wait_for_timeout(500)  # Small delay between scrolls
-            
-            # Get updated HTML with loaded images
-            soup = BeautifulSoup(driver.content(), 'html.parser')
-            comment_threads = soup.find_all('ytd-comment-thread-renderer')
-            
-            # Update comments with icons
-            for i, thread in enumerate(comment_threads):
-                if i >= len(comments):  # Safety check
-                    break
-                    
-                icon_elem = thread.select_one('ytd-comment-view-model > div > div > a > yt-img-shadow > img')
-                if icon_elem and icon_elem.has_attr('src'):
-                    icon_url = icon_elem['src']
-                    if icon_url.startswith('//'):
-                        icon_url = f'https:{icon_url}'
-                    comments[i]['commenter_icon'] = icon_url
-            
-            return comments
-            
-        except Exception as e:
-            print(f"Attempt {attempt + 1} failed for {post_url}: {str(e)}")
-            if attempt == max_retries - 1:
-                print(f"Failed to get comments for {post_url} after {max_retries} attempts")
-                return []
-            driver.wait_for_timeout(5000)
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed for {post_url}: {str(e)}")
+                if attempt == max_retries - 1:
+                    print(f"Failed to get comments for {post_url} after {max_retries} attempts")
+                    return []
+                time.sleep(5)
+    finally:
+        if retry_driver is not None:
+            try:
+                retry_driver.quit()
+            except Exception:
+                pass
 
 def get_source_res_version(img_url):
     """Convert image URL to source resolution version."""
@@ -132,80 +166,303 @@ def create_directories(channel_name, timestamp, base_dir=None, create_images_dir
         # Fallback to current directory
         return Path.cwd(), None if not create_images_dir else Path.cwd() / 'images'
 
-def download_image(url, save_path):
-    """Download image from URL and save to specified path."""
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
-        return True
-    except Exception as e:
-        print(f"Error downloading image {url}: {str(e)}")
-        return False
-
-def download_post_images(post_data, images_dir, post_index, image_quality='all'):
-    """Download all images for a post and update image paths."""
+def download_post_images(post_data, images_dir, post_index, image_quality='all', proxy_manager=None):
+    """Download all images for a post and update image paths.
+    
+    The post's files are downloaded concurrently through the shared session
+    pool for proxy_manager. Each returned Image records the names of its
+    downloaded files (relative to images_dir) in source_file/standard_file.
+    """
+    downloads = []
+    targets = []
     downloaded_images = []
     
     for img_index, img in enumerate(post_data['images']):
         # Create filenames based on quality setting
         filename_base = f"post_{post_index}_img_{img_index}"
         
-        if image_quality in ['sd', 'all']:
-            standard_path = images_dir / f"{filename_base}_standard.jpg"
-            if download_image(img['standard'], standard_path):
-                standard_url = img['standard']
-            else:
-                standard_url = img['standard']
-        else:
-            standard_url = None
-
-        if image_quality in ['src', 'all']:
-            source_path = images_dir / f"{filename_base}.jpg"
-            if download_image(img['source'], source_path):
-                source_url = img['source']
-            else:
-                source_url = img['source']
-        else:
-            source_url = None
-        
         # Only add URLs for requested quality
-        image_data = {}
-        if standard_url is not None:
-            image_data['standard'] = standard_url
-        if source_url is not None:
-            image_data['source'] = source_url
-            
-        downloaded_images.append(image_data)
+        image = Image(
+            standard=img['standard'] if image_quality in ['sd', 'all'] else None,
+            source=img['source'] if image_quality in ['src', 'all'] else None
+        )
+        if image.standard:
+            downloads.append((image.standard, images_dir / f"{filename_base}_standard.jpg"))
+            targets.append((image, 'standard_file'))
+        if image.source:
+            downloads.append((image.source, images_dir / f"{filename_base}.jpg"))
+            targets.append((image, 'source_file'))
+        downloaded_images.append(image)
     
+    results = get_session_pool(proxy_manager).download_many(downloads)
+    for (image, field), (_, path), ok in zip(targets, downloads, results):
+        if ok:
+            setattr(image, field, path.name)
     return downloaded_images
 
-def get_channel_icon(driver):
-    """Get channel icon URL from the page."""
-    soup = BeautifulSoup(driver.content(), 'html.parser')
-    channel_icon_elem = soup.select_one('ytd-backstage-post-thread-renderer > div > ytd-backstage-post-renderer > div > div > a > yt-img-shadow > img')
-    channel_icon = channel_icon_elem.get('src') if channel_icon_elem else ''
-    if channel_icon.startswith('//'):
-        channel_icon = f'https:{channel_icon}'
-    return channel_icon
+def parse_post_thread(thread_html):
+    """Parse a post thread's HTML into a Post record (without images or comments)."""
+    soup_thread = BeautifulSoup(thread_html, 'html.parser')
+    post_data = Post()
+    
+    # Check if post is member-only using a more reliable selector
+    member_badge = soup_thread.select_one('div > ytd-backstage-post-renderer span ytd-sponsors-only-badge-renderer')
+    post_data.member_only = bool(member_badge)
+    
+    # Get post link and timestamp
+    timestamp_elem = soup_thread.select_one('div > ytd-backstage-post-renderer > div > div > div > div > yt-formatted-string > a')
+    if timestamp_elem:
+        post_data.post_url = urljoin('https://www.youtube.com', timestamp_elem.get('href', ''))
+        post_data.timestamp = timestamp_elem.get_text()
+    
+    # Get post content
+    content_elem = soup_thread.select_one('yt-formatted-string#content-text')
+    if content_elem:
+        text = content_elem.get_text()
+        links = content_elem.find_all('a', class_='yt-simple-endpoint')
+        
+        found_links = []
+        for link in links:
+            shortened_text = link.get_text()
+            full_url = link.get('href', '')
+            if full_url.startswith('/'):
+                full_url = f'https://www.youtube.com{full_url}'
+            text = text.replace(shortened_text, full_url)
+            found_links.append({
+                'text': shortened_text,
+                'url': full_url
+            })
+        
+        post_data.content = text
+        post_data.links = found_links
+    
+    # Get like count
+    like_elem = soup_thread.select_one('ytd-comment-action-buttons-renderer > div > span')
+    post_data.like_count = like_elem.get_text().strip() if like_elem else '0'
+    
+    # Get comment count
+    comment_elem = soup_thread.select_one('ytd-comment-action-buttons-renderer > div > div > ytd-button-renderer > yt-button-shape > a > div:nth-child(2) > span')
+    comment_count = comment_elem.get_text() if comment_elem else '0'
+    post_data.comment_count = comment_count.split()[0]
+    
+    return post_data
+
+def _image_record(img_url, image_quality):
+    if img_url.startswith('//'):
+        img_url = f'https:{img_url}'
+    
+    image_data = Image()
+    if image_quality in ['sd', 'all']:
+        image_data.standard = img_url
+    if image_quality in ['src', 'all']:
+        image_data.source = get_source_res_version(img_url)
+    return image_data
+
+def parse_post_images(thread_html, image_quality='all'):
+    """Parse the images of a post thread whose images have been loaded."""
+    post_thread = BeautifulSoup(thread_html, 'html.parser')
+    images = []
+    
+    # Get multiple images first (if any)
+    multi_images = post_thread.select('div#content-attachment ytd-post-multi-image-renderer img#img')
+    if multi_images:
+        for img in multi_images:
+            if img.has_attr('src'):
+                images.append(_image_record(img['src'], image_quality))
+    else:
+        # Only check for single image if no multiple images were found
+        single_image = post_thread.select_one('div#content-attachment ytd-backstage-image-renderer img#img')
+        if single_image and single_image.has_attr('src'):
+            images.append(_image_record(single_image['src'], image_quality))
+    
+    return images
+
+# Threads already read are marked so later scrolls only read new ones
+UNREAD_THREAD_SELECTOR = "ytd-backstage-post-thread-renderer:not([data-pa-read])"
+MARK_READ_SCRIPT = "element => element.setAttribute('data-pa-read', '')"
+
+def harvest_posts(driver, member_only=False, max_posts=float('inf'), date_filter=None,
+                  snapshot_store=None, get_images=False, image_quality='all',
+                  verbose=False, trace=False):
+    """Scroll a channel's posts tab and yield each new post as soon as it is read.
+    
+    Args:
+        driver: Browser page showing the channel's posts tab
+        member_only: Only yield membership-only posts
+        max_posts: Stop after this many posts
+        date_filter: Optional dates.DateFilter; scrolling stops once it is exhausted
+        snapshot_store: Optional SnapshotStore for the raw post HTML
+        get_images: Bring each post into view and collect its images before yielding it
+        image_quality: Image quality to collect ('src', 'sd' or 'all')
+    """
+    posts_seen = set()
+    found = 0
+    no_new_posts_count = 0
+    scroll = get_scroll_strategy(driver, 'posts')
+    last_height = driver.evaluate("document.documentElement.scrollHeight")
+    
+    while True:
+        new_posts = 0
+        
+        for thread in driver.query_selector_all(UNREAD_THREAD_SELECTOR):
+            thread_html = thread.inner_html()
+            post_data = parse_post_thread(thread_html)
+            post_url = post_data.post_url
+            if not post_url:
+                continue  # Not rendered yet, read it again after the next scroll
+            thread.evaluate(MARK_READ_SCRIPT)
+            
+            # Check for duplicate posts using URL
+            if post_url in posts_seen:
+                continue
+            posts_seen.add(post_url)
+            
+            # Skip non-member posts if member_only flag is set
+            if member_only and not post_data.member_only:
+                continue
+            
+            # Skip posts outside the date range, stop once past `since`
+            if date_filter and not date_filter.accept(post_data):
+                if date_filter.exhausted:
+                    print(f"\nReached posts older than {date_filter.since:%Y-%m-%d}")
+                    return
+                continue
+            
+            if get_images:
+                # Images are lazy-loaded, bring the post into view first
+                thread.scroll_into_view_if_needed()
+                driver.wait_for_timeout(500)
+                thread_html = thread.evaluate("element => element.outerHTML")
+                post_data.images = parse_post_images(thread_html, image_quality)
+            
+            # Only posts that pass the filters are snapshotted, so reextract
+            # rebuilds the same set of posts
+            if snapshot_store:
+                snapshot_store.put('post', post_url, thread_html)
+            
+            found += 1
+            new_posts += 1
+            if verbose or trace:
+                print(f"Found post: {post_data.timestamp}")
+                print(f"Member only: {post_data.member_only}")
+                print(f"URL: {post_data.post_url}")
+                print(f"Likes: {post_data.like_count}")
+                print(f"Comments: {post_data.comment_count}")
+                print('-' * 50)
+            
+            yield post_data
+            
+            if found >= max_posts:
+                print(f"\nReached requested amount of {max_posts} posts")
+                return
+        
+        # Scroll down and wait for the next batches
+        if scroll.scrolls:
+            scroll.record(new_posts)
+        new_height = scroll.advance(driver)
+        
+        # Check if we got any new posts
+        no_new_posts_count = 0 if new_posts else no_new_posts_count + 1
+        
+        # If we're stuck at the bottom and haven't found new posts in 3 attempts, we're done
+        if new_height == last_height and not scroll.moved and no_new_posts_count >= 3:
+            return
+        
+        last_height = new_height
+        if trace:
+            print(f"Found {found} posts so far...")
+            print(f"Current height: {new_height}")
+            print(f"No new posts count: {no_new_posts_count}")
+        elif verbose:
+            print(f"Scrolling... ({found} posts)")
+
+def _open_writer(filename, channel_name, channel_icon, member_output='combined'):
+    """Open a streaming writer for the member output mode."""
+    if member_output == 'combined':
+        return ArchiveWriter(filename, channel_name, channel_icon)
+    return MemberArchiveWriter(filename, channel_name, channel_icon, member_output)
+
+def _save_posts(filename, channel_name, channel_icon, posts, writer=None, member_output='combined'):
+    """Save the final archive(s), or report on ones that were streamed by writer."""
+    if writer:
+        for path, count in writer.written():
+            print(f"\nExported {count} posts to {path}")
+        return []
+    
+    # Always save final JSON file
+    try:
+        for path, count in write_member_archives(filename, channel_name, channel_icon, posts, member_output):
+            print(f"\nExported {count} posts to {path}")
+    except Exception as e:
+        print(f"Error saving final JSON: {str(e)}")
+    
+    return posts
 
 def get_all_posts(driver, proxy_manager, get_comments=False, get_images=False, 
                   download_images=False, image_quality='all', output_dir=None, 
                   verbose=False, trace=False, max_posts=float('inf'), 
-                  member_only=False):
-    """Get all posts with specified options."""
+                  member_only=False, stream=False, job_queue=None, workers=1,
+                  pipeline=False, parse_workers=None, enrich_workers=2, prune_dom=False,
+                  snapshot_dir=None, since=None, until=None, profiler=None,
+                  download_avatars=False, avatar_dir=None, process_images=False,
+                  thumbnail_size=None, transcode=None, member_output='combined'):
+    """Get all posts with specified options.
+    
+    Posts are returned as Post records, which also support dict-style access.
+    With stream=True each post is written to the archive as soon as its
+    comments and images are collected and then released from memory; the
+    returned list is empty in that case.
+    
+    With job_queue set to a queue location (see jobqueue.open_queue), comments
+    and image downloads run as jobs in that queue, processed by `workers`
+    local worker processes and any external `post-archiver worker` processes.
+    
+    With pipeline=True scrolling, parsing (in `parse_workers` processes) and
+    enrichment (in `enrich_workers` threads) overlap; see pipeline.py. With
+    prune_dom=True the pipeline also empties posts in the page once shipped.
+    
+    With snapshot_dir set, the raw post and comment HTML is saved to a
+    snapshot store there for offline re-extraction (see snapshots.py).
+    
+    since and until (datetimes) limit the posts to an approximate date range;
+    scrolling stops once the feed is past `since` (see dates.DateFilter).
+    
+    With a profiling.Profiler, each phase of the run is profiled separately;
+    the caller calls profiler.finish() afterwards.
+    
+    With download_avatars=True commenter avatars are downloaded once each to
+    avatar_dir (default: an `avatars` directory next to the archive) and
+    comments reference them by commenter_avatar_id (see avatars.py).
+    
+    With process_images=True downloaded images are post-processed in a
+    process pool (see imageproc.py): real formats are detected, dimensions
+    and hashes recorded, and thumbnails of thumbnail_size pixels and/or
+    transcode ('webp' or 'avif') variants made. Requires Pillow.
+    
+    member_output chooses the archives written from the single harvest:
+    'combined' (one archive, posts tagged with member_only), 'split'
+    (separate members-only and public archives) or 'both'. Each post is
+    enriched once whichever archives it goes to. Split output needs an
+    authenticated session to see members-only posts.
+    """
     all_posts_data = []
-    posts_seen = set()
-    no_new_posts_count = 0
-    should_break = False
+    date_filter = DateFilter(since, until) if since or until else None
+    
+    if profiler:
+        profiler.start_phase('channel')
     
-    # Get channel info
-    channel_name = driver.url.split('@')[1].split('/')[0]
-    channel_icon = get_channel_icon(driver)
+    # Get channel info, cached across runs
+    channel = get_channel_metadata(driver)
+    channel_name = channel['name']
+    channel_icon = channel['icon']
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     
+    snapshot_store = None
+    if snapshot_dir:
+        from .snapshots import SnapshotStore
+        snapshot_store = SnapshotStore(snapshot_dir, channel=channel_name)
+        snapshot_store.put_channel(channel_icon)
+    
     # Create directories using specified output directory
     base_dir, images_dir = create_directories(
         channel_name, 
@@ -221,240 +478,419 @@ def get_all_posts(driver, proxy_manager, get_comments=False, get_images=False,
         print("No posts found. If trying to access member posts, make sure cookies are valid.")
         return []
     
-    # Initialize last_height before the loop
-    last_height = driver.evaluate("document.documentElement.scrollHeight")
+    filename = base_dir / f'posts_{channel_name}_{timestamp}.json'
     
-    while True:
-        initial_posts_count = len(all_posts_data)
-        
-        # Scroll down
-        driver.evaluate("window.scrollTo(0, document.documentElement.scrollHeight)")
-        driver.wait_for_timeout(2000)  # Wait for content to load
+    image_processor = None
+    avatar_store = None
+    writer = None
+    try:
+        if process_images and download_images and images_dir:
+            from .imageproc import ImageProcessor
+            image_processor = ImageProcessor(images_dir, thumbnail_size=thumbnail_size, transcode=transcode)
         
-        # Get all post threads
-        post_threads = driver.query_selector_all("ytd-backstage-post-thread-renderer")
+        if download_avatars and get_comments:
+            from .avatars import AvatarStore
+            avatar_store = AvatarStore(avatar_dir or base_dir / 'avatars', proxy_manager=proxy_manager)
         
-        # Process posts
-        for thread in post_threads:
-            # Convert element to BeautifulSoup object
-            thread_html = thread.inner_html()
-            soup_thread = BeautifulSoup(thread_html, 'html.parser')
+        if pipeline:
+            from .pipeline import run_pipeline
             
-            post_data = {}
+            if profiler:
+                profiler.start_phase('pipeline')
+            writer = _open_writer(filename, channel_name, channel_icon, member_output) if stream else None
+            sink = writer.write_post if writer else all_posts_data.append
             
-            # Check if post is member-only using a more reliable selector
-            member_badge = soup_thread.select_one('div > ytd-backstage-post-renderer span ytd-sponsors-only-badge-renderer')
-            is_member_only = bool(member_badge)
+            def on_post(post):
+                if avatar_store:
+                    avatar_store.add_comments(post.comments)
+                    if writer:
+                        # Settle this post's avatar IDs before it is written
+                        avatar_store.flush()
+                if image_processor:
+                    image_processor.submit_post(post)
+                    if writer:
+                        image_processor.wait(post)
+                sink(post)
             
-            # Skip non-member posts if member_only flag is set
-            if member_only and not is_member_only:
-                continue
-                
-            # Get post link and timestamp
-            timestamp_elem = soup_thread.select_one('div > ytd-backstage-post-renderer > div > div > div > div > yt-formatted-string > a')
-            if timestamp_elem:
-                post_data['post_url'] = urljoin('https://www.youtube.com', timestamp_elem.get('href', ''))
-                post_data['timestamp'] = timestamp_elem.get_text()
+            run_pipeline(
+                driver,
+                proxy_manager,
+                on_post=on_post,
+                get_comments=get_comments,
+                get_images=get_images,
+                download_images=download_images,
+                images_dir=images_dir,
+                image_quality=image_quality,
+                verbose=verbose,
+                trace=trace,
+                max_posts=max_posts,
+                member_only=member_only,
+                parse_workers=parse_workers,
+                enrich_workers=enrich_workers,
+                snapshot_store=snapshot_store,
+                date_filter=date_filter,
+                prune_dom=prune_dom
+            )
+        else:
+            if profiler:
+                profiler.start_phase('scroll')
             
-            # Get post content
-            content_elem = soup_thread.select_one('yt-formatted-string#content-text')
-            if content_elem:
-                text = content_elem.get_text()
-                links = content_elem.find_all('a', class_='yt-simple-endpoint')
-                
-                found_links = []
-                for link in links:
-                    shortened_text = link.get_text()
-                    full_url = link.get('href', '')
-                    if full_url.startswith('/'):
-                        full_url = f'https://www.youtube.com{full_url}'
-                    text = text.replace(shortened_text, full_url)
-                    found_links.append({
-                        'text': shortened_text,
-                        'url': full_url
-                    })
-                
-                post_data['content'] = text
-                post_data['member_only'] = is_member_only  # Add member_only status
-                post_data['links'] = found_links
-            else:
-                post_data['content'] = None
-                post_data['member_only'] = is_member_only  # Add member_only status
-                post_data['links'] = []
+            for post_data in harvest_posts(driver, member_only=member_only, max_posts=max_posts,
+                                           date_filter=date_filter, snapshot_store=snapshot_store,
+                                           verbose=verbose, trace=trace):
+                all_posts_data.append(post_data)
             
-            # Initialize images list with both versions
-            post_data['images'] = []
+            print(f"\nCollected {len(all_posts_data)} posts, now processing...")
+            if verbose:
+                print(f"Post scrolling: {get_scroll_strategy(driver, 'posts').describe()}")
             
-            # Get like count
-            like_elem = soup_thread.select_one('ytd-comment-action-buttons-renderer > div > span')
-            post_data['like_count'] = like_elem.get_text().strip() if like_elem else '0'
+            # Second pass - collect images
+            if get_images:
+                if profiler:
+                    profiler.start_phase('images')
+                print("\nCollecting images...")
+                driver.evaluate("window.scrollTo(0, 0)")
+                driver.wait_for_timeout(2000)
+                
+                for post_data in all_posts_data:
+                    # Scroll to the post
+                    post_url = post_data['post_url']
+                    post_elem = driver.query_selector(f'a[href*="{post_url.split("/")[-1]}"]')
+                    if post_elem:
+                        driver.evaluate("element => element.scrollIntoView(true)", post_elem)
+                        driver.wait_for_timeout(500)  # Small delay to let images load
+                        
+                        # Get updated HTML for this post
+                        thread_html = post_elem.evaluate("element => element.closest('ytd-backstage-post-thread-renderer').outerHTML")
+                        post_data.images = parse_post_images(thread_html, image_quality)
+                        if snapshot_store:
+                            # Supersedes the earlier capture, now with images loaded
+                            snapshot_store.put('post', post_url, thread_html)
             
-            # Get comment count
-            comment_elem = soup_thread.select_one('ytd-comment-action-buttons-renderer > div > div > ytd-button-renderer > yt-button-shape > a > div:nth-child(2) > span')
-            comment_count = comment_elem.get_text() if comment_elem else '0'
-            post_data['comment_count'] = comment_count.split()[0]
+            # Third pass - collect comments and download images
+            if profiler:
+                profiler.start_phase('enrich')
             
-            # Check for duplicate posts using URL
-            post_url = post_data.get('post_url', '')
-            if post_url and post_url not in posts_seen:
-                posts_seen.add(post_url)
-                all_posts_data.append(post_data)
-                if verbose or trace:
-                    print(f"Found post: {post_data['timestamp']}")
-                    print(f"Member only: {post_data['member_only']}")
-                    print(f"URL: {post_data['post_url']}")
-                    print(f"Likes: {post_data['like_count']}")
-                    print(f"Comments: {post_data['comment_count']}")
-                    print('-' * 50)
+            if job_queue and (get_comments or download_images):
+                from .jobqueue import run_distributed_enrichment
                 
-                if len(all_posts_data) >= max_posts:
-                    print(f"\nReached requested amount of {max_posts} posts")
-                    should_break = True
-                    break
-        
-        if should_break:
-            break
+                run_distributed_enrichment(
+                    job_queue,
+                    all_posts_data,
+                    get_comments=get_comments,
+                    download_images=download_images,
+                    images_dir=images_dir,
+                    image_quality=image_quality,
+                    driver_options=dict(getattr(driver, 'driver_options', {}),
+                                        proxies=proxy_manager.proxies if proxy_manager else None),
+                    workers=workers,
+                    snapshot_store=snapshot_store
+                )
+                for post_data in all_posts_data:
+                    if avatar_store:
+                        avatar_store.add_comments(post_data.comments)
+                    if image_processor:
+                        image_processor.submit_post(post_data)
+                # Enrichment is done, the loop below only saves
+                get_comments = download_images = False
             
-        # Check scroll progress
-        new_height = driver.evaluate("document.documentElement.scrollHeight")
-        
-        # Check if we got any new posts
-        if len(all_posts_data) == initial_posts_count:
-            no_new_posts_count += 1
-        else:
-            no_new_posts_count = 0
-        
-        # If height didn't change and we haven't found new posts in 3 attempts, we're done
-        if new_height == last_height and no_new_posts_count >= 3:
-            break
+            total_posts = len(all_posts_data)
+            writer = _open_writer(filename, channel_name, channel_icon, member_output) if stream else None
             
-        last_height = new_height
-        if trace:
-            print(f"Found {len(all_posts_data)} posts so far...")
-            print(f"Current height: {new_height}, Last height: {last_height}")
-            print(f"No new posts count: {no_new_posts_count}")
-        elif verbose:
-            print(f"Scrolling... ({len(all_posts_data)} posts)")
-    
-    print(f"\nCollected {len(all_posts_data)} posts, now processing...")
-    
-    # Second pass - collect images
-    if get_images:
-        print("\nCollecting images...")
-        driver.evaluate("window.scrollTo(0, 0)")
-        driver.wait_for_timeout(2000)
-        
-        for post_data in all_posts_data:
-            # Scroll to the post
-            post_url = post_data['post_url']
-            post_elem = driver.query_selector(f'a[href*="{post_url.split("/")[-1]}"]')
-            if post_elem:
-                driver.evaluate("element => element.scrollIntoView(true)", post_elem)
-                driver.wait_for_timeout(500)  # Small delay to let images load
+            for index, post_data in enumerate(all_posts_data, 1):
+                # Download images if requested
+                if download_images and post_data.images and images_dir:
+                    post_data.images = download_post_images(post_data, images_dir, index, image_quality,
+                                                                proxy_manager)
+                    if image_processor:
+                        image_processor.submit_post(post_data)
                 
-                # Get updated HTML for this post
-                post_thread = BeautifulSoup(
-                    post_elem.evaluate("element => element.closest('ytd-backstage-post-thread-renderer').outerHTML"),
-                    'html.parser'
-                )
+                # Get comments if requested
+                if get_comments:
+                    if index == 1:  # Only print this once at the start
+                        print("\nCollecting comments...")
+                    
+                    post_url = post_data.post_url
+                    if verbose:
+                        print(f"Getting comments for post {index}/{total_posts}: {post_url}")
+                    else:
+                        print(f"Getting comments for post {index}/{total_posts}")
+                    
+                    comments = get_post_comments(
+                        post_url=post_url,
+                        driver=driver,
+                        proxy_manager=proxy_manager,
+                        snapshot_store=snapshot_store
+                    )
+                    post_data.comments = comments
+                    if avatar_store:
+                        avatar_store.add_comments(comments)
+                    if verbose:
+                        print(f"Found {len(comments)} comments")
                 
-                # Initialize images list
-                post_data['images'] = []
+                if writer:
+                    if image_processor:
+                        image_processor.wait(post_data)
+                    if avatar_store:
+                        # Settle this post's avatar IDs before it is written
+                        avatar_store.flush()
+                    # Hand the finished post to the writer and release it
+                    writer.write_post(post_data)
+                    all_posts_data[index - 1] = None
+                    continue
                 
-                # Get multiple images first (if any)
-                multi_images = post_thread.select('div#content-attachment ytd-post-multi-image-renderer img#img')
-                if multi_images:
-                    for img in multi_images:
-                        if img.has_attr('src'):
-                            img_url = img['src']
-                            if img_url.startswith('//'):
-                                img_url = f'https:{img_url}'
-                            
-                            image_data = {}
-                            if image_quality in ['sd', 'all']:
-                                image_data['standard'] = img_url
-                            if image_quality in ['src', 'all']:
-                                image_data['source'] = get_source_res_version(img_url)
-                            
-                            post_data['images'].append(image_data)
-                else:
-                    # Only check for single image if no multiple images were found
-                    single_image = post_thread.select_one('div#content-attachment ytd-backstage-image-renderer img#img')
-                    if single_image and single_image.has_attr('src'):
-                        img_url = single_image['src']
-                        if img_url.startswith('//'):
-                            img_url = f'https:{img_url}'
-                        
-                        image_data = {}
-                        if image_quality in ['sd', 'all']:
-                            image_data['standard'] = img_url
-                        if image_quality in ['src', 'all']:
-                            image_data['source'] = get_source_res_version(img_url)
-                        
-                        post_data['images'].append(image_data)
-    
-    # Third pass - collect comments and download images
-    total_posts = len(all_posts_data)
-    for index, post_data in enumerate(all_posts_data, 1):
-        # Download images if requested
-        if download_images and post_data.get('images') and images_dir:
-            post_data['images'] = download_post_images(post_data, images_dir, index, image_quality)
+                # Save progress every 5 posts
+                if index % 5 == 0:
+                    temp_filename = base_dir / f'posts_{channel_name}_temp_{timestamp}.json'
+                    try:
+                        # Only save processed posts
+                        write_archive(temp_filename, channel_name, channel_icon, all_posts_data[:index])
+                        if verbose:
+                            print(f"\nSaved progress ({index}/{total_posts} posts) to {temp_filename}")
+                    except Exception as e:
+                        print(f"Error saving progress: {str(e)}")
+                    
+                    # Add a small delay to ensure messages are printed in order
+                    driver.wait_for_timeout(100)
+    except BaseException:
+        if writer:
+            writer.abort()
+        raise
+    finally:
+        if image_processor:
+            image_processor.close()
+        if writer:
+            writer.close()
+        if avatar_store:
+            avatar_store.close()
+    
+    if verbose and pipeline:
+        print(f"Post scrolling: {get_scroll_strategy(driver, 'posts').describe()}")
+    elif verbose and get_comments:
+        print(f"Comment scrolling: {get_scroll_strategy(driver, 'comments').describe()}")
+    
+    if profiler:
+        profiler.start_phase('save')
+    return _save_posts(filename, channel_name, channel_icon, all_posts_data, writer, member_output)
+
+# Options accepted by iter_posts, with their defaults
+ITER_POSTS_OPTIONS = {
+    'get_comments': False,
+    'lazy_comments': False,
+    'get_images': False,
+    'download_images': False,
+    'images_dir': None,
+    'image_quality': 'all',
+    'max_posts': float('inf'),
+    'member_only': False,
+    'since': None,
+    'until': None,
+    'proxy_manager': None,
+    'browser_type': 'chromium',
+    'storage_state': None,
+    'cookie_file': None,
+    'cookies': None,
+    'record_har': None,
+    'replay_har': None,
+    'viewport_height': None,
+    'scroll_options': None,
+    'snapshot_dir': None,
+    'avatar_dir': None,
+    'driver': None,
+    'verbose': False,
+    'trace': False,
+}
+
+class PostStream:
+    """Iterator over a channel's posts, returned by iter_posts.
+    
+    Closing the stream (explicitly, by leaving a `with` block, or by
+    exhausting it) closes every browser it opened.
+    """
+    
+    def __init__(self, url, options):
+        self.url = url
+        self.options = options
+        self._driver = None
+        self._comments_driver = None
+        self._avatar_store = None
+        if options['avatar_dir']:
+            from .avatars import AvatarStore
+            self._avatar_store = AvatarStore(options['avatar_dir'], proxy_manager=options['proxy_manager'])
+        self._posts = self._generate()
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        return next(self._posts)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __del__(self):
+        self.close()
+    
+    def _get_comments_driver(self):
+        # The feed page can't navigate away, so comments get their own browser
+        if self._comments_driver is None:
+            self._comments_driver = create_driver(self.options['proxy_manager'],
+                                                  **getattr(self._driver, 'driver_options', {}))
+        return self._comments_driver
+    
+    def load_comments(self, post):
+        """Fetch a post's comments on demand (for lazy_comments) and store them on the post."""
+        if self._driver is None:
+            raise RuntimeError("The post stream is closed")
+        post.comments = get_post_comments(
+            post_url=post.post_url,
+            driver=self._get_comments_driver(),
+            proxy_manager=self.options['proxy_manager']
+        )
+        if self._avatar_store:
+            self._avatar_store.add_comments(post.comments)
+            self._avatar_store.flush()
+        return post.comments
+    
+    def _generate(self):
+        options = self.options
+        owns_driver = options['driver'] is None
+        snapshot_store = None
         
-        # Get comments if requested
-        if get_comments:
-            if index == 1:  # Only print this once at the start
-                print("\nCollecting comments...")
-            
-            post_url = post_data['post_url']
-            if verbose:
-                print(f"Getting comments for post {index}/{total_posts}: {post_url}")
+        try:
+            if owns_driver:
+                self._driver = create_driver(
+                    proxy_manager=options['proxy_manager'],
+                    browser_type=options['browser_type'],
+                    cookie_file=options['cookie_file'],
+                    cookies=options['cookies'],
+                    storage_state=options['storage_state'],
+                    record_har=options['record_har'],
+                    replay_har=options['replay_har'],
+                    viewport_height=options['viewport_height'],
+                    scroll_options=options['scroll_options']
+                )
+                self._driver.goto(self.url)
             else:
-                print(f"Getting comments for post {index}/{total_posts}")
+                self._driver = options['driver']
             
-            comments = get_post_comments(
-                post_url=post_url,
-                driver=driver,
-                proxy_manager=proxy_manager
-            )
-            post_data['comments'] = comments
-            if verbose:
-                print(f"Found {len(comments)} comments")
-        
-        # Save progress every 5 posts
-        if index % 5 == 0:
-            temp_filename = base_dir / f'posts_{channel_name}_temp_{timestamp}.json'
             try:
-                with open(temp_filename, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'channel': channel_name,
-                        'channel_icon': channel_icon,
-                        'scrape_date': datetime.now().isoformat(),
-                        'scrape_timestamp': int(datetime.now().timestamp()),
-                        'posts_count': len(all_posts_data),
-                        'posts': all_posts_data[:index]  # Only save processed posts
-                    }, f, ensure_ascii=False, indent=2)
-                if verbose:
-                    print(f"\nSaved progress ({index}/{total_posts} posts) to {temp_filename}")
-            except Exception as e:
-                print(f"Error saving progress: {str(e)}")
+                self._driver.wait_for_selector("ytd-backstage-post-thread-renderer", timeout=10000)
+            except Exception:
+                print("No posts found. If trying to access member posts, make sure cookies are valid.")
+                return
+            
+            if options['snapshot_dir']:
+                from .snapshots import SnapshotStore
+                channel_name = get_channel_metadata(self._driver)['name']
+                snapshot_store = SnapshotStore(options['snapshot_dir'], channel=channel_name)
             
-            # Add a small delay to ensure messages are printed in order
-            driver.wait_for_timeout(100)
+            date_filter = None
+            if options['since'] or options['until']:
+                date_filter = DateFilter(options['since'], options['until'])
+            
+            images_dir = Path(options['images_dir']) if options['images_dir'] else None
+            if options['download_images'] and images_dir:
+                images_dir.mkdir(parents=True, exist_ok=True)
+            
+            posts = harvest_posts(
+                self._driver,
+                member_only=options['member_only'],
+                max_posts=options['max_posts'],
+                date_filter=date_filter,
+                snapshot_store=snapshot_store,
+                get_images=options['get_images'],
+                image_quality=options['image_quality'],
+                verbose=options['verbose'],
+                trace=options['trace']
+            )
+            for index, post in enumerate(posts, 1):
+                if options['download_images'] and images_dir and post.images:
+                    post.images = download_post_images(post, images_dir, index, options['image_quality'],
+                                                       options['proxy_manager'])
+                
+                if options['get_comments'] and not options['lazy_comments']:
+                    post.comments = get_post_comments(
+                        post_url=post.post_url,
+                        driver=self._get_comments_driver(),
+                        proxy_manager=options['proxy_manager'],
+                        snapshot_store=snapshot_store
+                    )
+                    if self._avatar_store:
+                        self._avatar_store.add_comments(post.comments)
+                        # Settle this post's avatar IDs before the caller sees it
+                        self._avatar_store.flush()
+                
+                yield post
+        finally:
+            self._close_drivers(owns_driver)
     
-    # Always save final JSON file
-    filename = base_dir / f'posts_{channel_name}_{timestamp}.json'
-    try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump({
-                'channel': channel_name,
-                'channel_icon': channel_icon,
-                'scrape_date': datetime.now().isoformat(),
-                'scrape_timestamp': int(datetime.now().timestamp()),
-                'posts_count': len(all_posts_data),
-                'posts': all_posts_data
-            }, f, ensure_ascii=False, indent=2)
-        print(f"\nExported {len(all_posts_data)} posts to {filename}")
-    except Exception as e:
-        print(f"Error saving final JSON: {str(e)}")
+    def _close_drivers(self, owns_driver=True):
+        for driver in (self._comments_driver, self._driver if owns_driver else None):
+            if driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+        self._comments_driver = None
+        self._driver = None
+    
+    def close(self):
+        """Stop harvesting and close the browsers."""
+        posts = getattr(self, '_posts', None)
+        if posts is not None:
+            # Runs the generator's cleanup if it was started
+            posts.close()
+        if getattr(self, '_driver', None) is not None or getattr(self, '_comments_driver', None) is not None:
+            self._close_drivers(self.options['driver'] is None)
+        avatar_store = getattr(self, '_avatar_store', None)
+        if avatar_store is not None:
+            self._avatar_store = None
+            avatar_store.close()
+
+def iter_posts(url, options=None, **kwargs):
+    """Yield a channel's posts one at a time, as soon as each is harvested.
+    
+    Unlike get_all_posts nothing is written to disk (unless download_images
+    or snapshot_dir ask for it) and posts aren't kept after they are
+    yielded, so memory stays flat and the first post arrives after a single
+    page load.
+    
+    Args:
+        url: Channel posts URL or channel name
+        options: Dict of options; keyword arguments are merged on top. Keys:
+            get_comments: Fetch each post's comments before yielding it
+            lazy_comments: With get_comments, skip fetching and let the caller
+                use PostStream.load_comments(post) for the posts it wants
+            get_images: Collect image URLs
+            download_images, images_dir: Download images into images_dir
+            image_quality: 'src', 'sd' or 'all'
+            max_posts, member_only, since, until: As for get_all_posts
+            proxy_manager, browser_type, storage_state, cookie_file, cookies,
+            record_har, replay_har, viewport_height, scroll_options: Passed
+                to create_driver
+            snapshot_dir: Save raw HTML to a snapshot store
+            avatar_dir: Download commenter avatars once each into this
+                avatar store and set commenter_avatar_id on comments
+            driver: Use an existing page (already showing the channel's posts
+                tab) instead of opening a browser; it is not closed
+    
+    Returns:
+        A PostStream; iterate it for Post records, and use it as a context
+        manager (or call close()) to release the browser on early exit.
+    
+    Example:
+        with iter_posts('channel', get_comments=True, max_posts=10) as posts:
+            for post in posts:
+                print(post.post_url, len(post.comments))
+    """
+    merged = dict(options or {})
+    merged.update(kwargs)
+    unknown = set(merged) - set(ITER_POSTS_OPTIONS)
+    if unknown:
+        raise TypeError(f"Unknown iter_posts options: {', '.join(sorted(unknown))}")
     
-    return all_posts_data
+    return PostStream(normalize_channel_url(url), dict(ITER_POSTS_OPTIONS, **merged))
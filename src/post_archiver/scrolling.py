@@ -0,0 +1,181 @@
+"""Scroll strategies for loading more posts and comments
+
+YouTube loads the feed and comment sections in continuation batches, each
+requested when its sentinel element (ytd-continuation-item-renderer) comes
+into view. A ScrollStrategy decides how to get there and how long to wait:
+
+  bottom    scroll to the bottom of the page (the original behaviour)
+  sentinel  scroll the continuation sentinel itself into view
+  step      scroll down by a fixed number of pixels (default: one viewport)
+
+Each call to advance() makes `nudges` scrolls, waiting after each one only
+until the page grows (up to wait_ms), instead of sleeping a fixed time. With
+a target latency the strategy tunes itself: it adds nudges while batches
+arrive faster than the target and drops them when they come slower, so more
+batches are loaded per round trip without outrunning the server.
+
+Strategies are configured per browser through create_driver's
+scroll_options, so every browser created with the same driver options
+(comment retries, pipeline threads, queue workers) scrolls the same way.
+Each page keeps separate strategies, and stats, for posts and comments.
+"""
+import time
+import logging
+
+SCROLL_MODES = ('bottom', 'sentinel', 'step')
+SENTINEL_SELECTOR = 'ytd-continuation-item-renderer'
+HEIGHT_SCRIPT = "document.documentElement.scrollHeight"
+POSITION_SCRIPT = "window.scrollY"
+
+MAX_NUDGES = 8
+
+_SCROLL_SCRIPTS = {
+    'bottom': "() => window.scrollTo(0, document.documentElement.scrollHeight)",
+    'sentinel': """selector => {
+        const sentinels = document.querySelectorAll(selector);
+        if (!sentinels.length) {
+            window.scrollTo(0, document.documentElement.scrollHeight);
+            return false;
+        }
+        sentinels[sentinels.length - 1].scrollIntoView({block: 'end'});
+        return true;
+    }""",
+    'step': "step => window.scrollBy(0, step || window.innerHeight)",
+}
+
+class ScrollStrategy:
+    """Scrolls a page to load the next continuation batches.
+    
+    Args:
+        mode: 'bottom', 'sentinel' or 'step'
+        nudges: Scrolls per advance() (the starting value when tuning)
+        step: Pixels per scroll in 'step' mode (default: viewport height)
+        wait_ms: Longest wait for the page to grow after a scroll
+        settle_ms: Extra wait after the page grows, for rendering to finish
+        target_ms: Target latency per scroll; enables self-tuning of nudges
+        sentinel: Selector of the continuation element for 'sentinel' mode
+    """
+    
+    def __init__(self, mode='bottom', nudges=1, step=None, wait_ms=2000, settle_ms=250,
+                 target_ms=None, sentinel=SENTINEL_SELECTOR):
+        if mode not in SCROLL_MODES:
+            raise ValueError(f"Unknown scroll mode: {mode}")
+        self.mode = mode
+        self.nudges = max(1, int(nudges))
+        self.step = step
+        self.wait_ms = wait_ms
+        self.settle_ms = settle_ms
+        self.target_ms = target_ms
+        self.sentinel = sentinel
+        
+        self.scrolls = 0
+        self.items = 0
+        self.grown = 0
+        self.latency_ms = 0.0
+        # Whether the last advance() moved down the page; in step mode this
+        # is progress even when the page didn't grow
+        self.moved = False
+    
+    def _scroll(self, driver):
+        if self.mode == 'sentinel':
+            driver.evaluate(_SCROLL_SCRIPTS['sentinel'], self.sentinel)
+        elif self.mode == 'step':
+            driver.evaluate(_SCROLL_SCRIPTS['step'], self.step)
+        else:
+            driver.evaluate(_SCROLL_SCRIPTS['bottom'])
+    
+    def _wait_for_growth(self, driver, height):
+        """Wait until the page is taller than height. Returns the latency in ms, or None."""
+        started = time.monotonic()
+        try:
+            driver.wait_for_function(f"h => {HEIGHT_SCRIPT} > h", arg=height, timeout=self.wait_ms)
+        except Exception:
+            return None
+        return (time.monotonic() - started) * 1000
+    
+    def advance(self, driver):
+        """Scroll to load more content and return the new page height.
+        
+        Callers should treat an unchanged height as the end of the content
+        only if `moved` is False as well.
+        """
+        height = driver.evaluate(HEIGHT_SCRIPT)
+        position = driver.evaluate(POSITION_SCRIPT)
+        latencies = []
+        waits = 0
+        
+        for _ in range(self.nudges):
+            self._scroll(driver)
+            self.scrolls += 1
+            if self.mode == 'step' and driver.evaluate(
+                    "() => window.innerHeight + window.scrollY < document.documentElement.scrollHeight - 1"):
+                # Not at the bottom yet, nothing to wait for
+                continue
+            waits += 1
+            latency = self._wait_for_growth(driver, height)
+            if latency is None:
+                break
+            latencies.append(latency)
+            self.grown += 1
+            self.latency_ms += latency
+            height = driver.evaluate(HEIGHT_SCRIPT)
+        
+        if latencies and self.settle_ms:
+            driver.wait_for_timeout(self.settle_ms)
+        self._tune(latencies, waits)
+        self.moved = driver.evaluate(POSITION_SCRIPT) > position
+        return driver.evaluate(HEIGHT_SCRIPT)
+    
+    def _tune(self, latencies, waits):
+        # Only scrolls that reached the bottom and waited say anything about the server
+        if not self.target_ms or not waits:
+            return
+        if len(latencies) < waits:
+            # Some scrolls loaded nothing: the server is behind, or the feed ended
+            self.nudges = max(1, self.nudges - 1)
+        elif sum(latencies) / len(latencies) < self.target_ms and self.nudges < MAX_NUDGES:
+            self.nudges += 1
+        elif sum(latencies) / len(latencies) > self.target_ms * 1.5:
+            self.nudges = max(1, self.nudges - 1)
+    
+    def record(self, items):
+        """Count items (posts or comments) gained since the last advance()."""
+        self.items += items
+    
+    def stats(self):
+        """Return a dict of scroll statistics."""
+        return {
+            'mode': self.mode,
+            'nudges': self.nudges,
+            'scrolls': self.scrolls,
+            'items': self.items,
+            'items_per_scroll': round(self.items / self.scrolls, 2) if self.scrolls else 0.0,
+            'avg_batch_latency_ms': round(self.latency_ms / self.grown) if self.grown else None,
+        }
+    
+    def describe(self):
+        stats = self.stats()
+        latency = stats['avg_batch_latency_ms']
+        return (f"{stats['mode']} x{stats['nudges']}: {stats['items']} items in {stats['scrolls']} scrolls "
+                f"({stats['items_per_scroll']} per scroll"
+                + (f", {latency} ms per batch)" if latency is not None else ")"))
+
+def get_scroll_strategy(driver, purpose='posts'):
+    """Return the page's ScrollStrategy for 'posts' or 'comments'.
+    
+    Built on first use from the scroll_options passed to create_driver.
+    """
+    strategies = getattr(driver, 'scroll_strategies', None)
+    if strategies is None:
+        strategies = {}
+        try:
+            driver.scroll_strategies = strategies
+        except AttributeError:
+            pass
+    strategy = strategies.get(purpose)
+    if strategy is None:
+        options = getattr(driver, 'driver_options', {}).get('scroll_options') or {}
+        strategy = strategies[purpose] = ScrollStrategy(**options)
+        logging.getLogger('post_archiver').debug(
+            f"Scrolling {purpose} in {strategy.mode} mode with {strategy.nudges} nudges")
+    return strategy
@@ -0,0 +1,178 @@
+"""Raw snapshot store for offline re-extraction
+
+While scraping, the raw HTML that posts and comments are extracted from can be
+saved to a snapshot store. When YouTube changes its markup and the selectors
+start returning empty fields, fixed selectors can then be re-run over the
+snapshots with `post-archiver reextract`, without a browser or network.
+
+Layout of a store directory:
+
+    manifest.jsonl            one line per capture: kind, channel, post URL, hash
+                              (plus one 'channel' line per run with the icon URL)
+    objects/ab/abcdef....gz   gzip-compressed payloads named by SHA-256
+
+Payloads are content-addressed, so capturing the same HTML again (for example
+a post seen on several scrolls or runs) only adds a manifest line.
+"""
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+
+class SnapshotStore:
+    """Compressed, deduplicated store of raw post and comment HTML.
+    
+    Args:
+        root: Store directory
+        channel: Channel that captures made through this instance belong to
+    """
+    
+    def __init__(self, root, channel=None):
+        self.root = Path(root)
+        self.channel = channel
+        self.objects_dir = self.root / 'objects'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.root / 'manifest.jsonl'
+        self._lock = threading.Lock()
+        self._captured = set()
+    
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / f"{digest}.gz"
+    
+    def put(self, kind, post_url, payload):
+        """Store a payload and record it in the manifest; returns its hash."""
+        data = payload.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        
+        with self._lock:
+            if (kind, post_url, digest) in self._captured:
+                return digest
+            
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            
+            entry = {
+                'kind': kind,
+                'channel': self.channel,
+                'post_url': post_url,
+                'sha256': digest,
+                'captured': datetime.now().isoformat(),
+            }
+            # Single small appends, so concurrent workers don't interleave lines
+            with open(self.manifest_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._captured.add((kind, post_url, digest))
+        
+        return digest
+    
+    def put_channel(self, channel_icon):
+        """Record channel details that aren't part of any post payload."""
+        entry = {
+            'kind': 'channel',
+            'channel': self.channel,
+            'channel_icon': channel_icon,
+            'captured': datetime.now().isoformat(),
+        }
+        with self._lock:
+            with open(self.manifest_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+    
+    def get(self, digest):
+        """Read a payload by hash."""
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+    
+    def entries(self):
+        """Yield manifest entries in capture order."""
+        if not self.manifest_file.exists():
+            return
+        with open(self.manifest_file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    
+    def latest_captures(self):
+        """Map each channel to its posts' latest captures.
+        
+        Returns {channel: {post_url: {kind: sha256}}}, with posts in the order
+        they were first captured.
+        """
+        channels = {}
+        for entry in self.entries():
+            if entry['kind'] == 'channel':
+                continue
+            posts = channels.setdefault(entry['channel'], {})
+            posts.setdefault(entry['post_url'], {})[entry['kind']] = entry['sha256']
+        return channels
+    
+    def channel_icons(self):
+        """Map each channel to its most recently recorded icon URL."""
+        return {entry['channel']: entry['channel_icon']
+                for entry in self.entries() if entry['kind'] == 'channel'}
+
+def _reextract_post(root, captures, image_quality):
+    """Rebuild one post from its snapshots; runs in a worker process."""
+    from .scraper import parse_post_thread, parse_post_images, parse_comments, parse_comment_icons
+    
+    store = SnapshotStore(root)
+    thread_html = store.get(captures['post'])
+    post = parse_post_thread(thread_html)
+    post.images = parse_post_images(thread_html, image_quality)
+    
+    if 'comments' in captures:
+        page_html = store.get(captures['comments'])
+        post.comments = parse_comment_icons(page_html, parse_comments(page_html))
+    return post
+
+def reextract(root, output_dir=None, image_quality='all', channels=None, workers=None):
+    """Rebuild archives from a snapshot store in parallel across processes.
+    
+    Args:
+        root: Snapshot store directory
+        output_dir: Directory for the rebuilt archives (default: current directory)
+        image_quality: Image quality to extract ('src', 'sd' or 'all')
+        channels: Optional list of channel names to rebuild (default: all)
+        workers: Worker processes (default: CPU count)
+    
+    Returns:
+        List of written archive paths
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from .writer import write_archive
+    
+    logger = logging.getLogger('post_archiver')
+    store = SnapshotStore(root)
+    output_dir = Path(output_dir) if output_dir else Path.cwd()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    channel_icons = store.channel_icons()
+    written = []
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for channel, posts in store.latest_captures().items():
+            if channels and channel not in channels:
+                continue
+            
+            post_captures = [captures for captures in posts.values() if 'post' in captures]
+            channel_icon = channel_icons.get(channel, '')
+            rebuilt = list(pool.map(_reextract_post, [str(store.root)] * len(post_captures),
+                                    post_captures, [image_quality] * len(post_captures),
+                                    chunksize=16))
+            
+            filename = output_dir / f'posts_{channel}_reextract_{timestamp}.json'
+            write_archive(filename, channel, channel_icon, rebuilt)
+            logger.info(f"Rebuilt {len(rebuilt)} posts for {channel}")
+            print(f"Exported {len(rebuilt)} posts to {filename}")
+            written.append(filename)
+    
+    return written
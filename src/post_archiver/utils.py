@@ -3,8 +3,6 @@ import os
 import logging
 from pathlib import Path
 from datetime import datetime
-import requests
-import browser_cookie3
 
 def setup_logging(verbose, trace):
     """Configure logging based on verbosity level."""
@@ -44,6 +42,21 @@ def setup_logging(verbose, trace):
     elif verbose:
         logger.info("Verbose logging enabled")
 
+def get_cache_dir(name=None, create=True):
+    """Return the post-archiver cache directory, creating it if needed.
+    
+    Args:
+        name: Optional subdirectory inside the cache directory
+        create: Create the directory; callers that only read can defer this
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    cache_dir = Path(base) / 'post-archiver'
+    if name:
+        cache_dir = cache_dir / name
+    if create:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
 def create_directories(channel_name, timestamp, base_dir=None, create_images_dir=False):
     """Create output directories for saving data."""
     logger = logging.getLogger('post_archiver')
@@ -75,21 +88,14 @@ def create_directories(channel_name, timestamp, base_dir=None, create_images_dir
         logger.warning(f"Falling back to current directory: {fallback_dir}")
         return fallback_dir, None if not create_images_dir else fallback_dir / 'images'
 
-def download_image(url, save_path):
-    """Download image from URL and save to specified path."""
-    logger = logging.getLogger('post_archiver')
-    try:
-        logger.debug(f"Downloading image from {url}")
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
-        logger.info(f"Successfully downloaded image to {save_path}")
-        return True
-    except Exception as e:
-        logger.error(f"Error downloading image {url}: {str(e)}")
-        return False
+def download_image(url, save_path, proxy_manager=None):
+    """Download image from URL and save to specified path.
+    
+    Uses the shared keep-alive session pool, routed through proxy_manager's
+    proxies when given.
+    """
+    from .downloads import get_session_pool
+    return get_session_pool(proxy_manager).download(url, save_path)
 
 def get_browser_cookies(browser_name='chrome', domain='.youtube.com'):
     """Get cookies from browser for specified domain.
@@ -100,6 +106,12 @@ def get_browser_cookies(browser_name='chrome', domain='.youtube.com'):
     """
     logger = logging.getLogger('post_archiver')
     
+    try:
+        import browser_cookie3
+    except ImportError:
+        logger.error("browser-cookie3 is required for --browser-cookies (pip install browser-cookie3)")
+        return None
+    
     browser_functions = {
         'chrome': browser_cookie3.chrome,
         'firefox': browser_cookie3.firefox,
@@ -0,0 +1,258 @@
+"""Watch mode: poll channels on a schedule and archive new or edited posts
+
+Instead of launching a browser and scrolling the whole feed for every run,
+`post-archiver watch` keeps one warm browser and only loads the first page of
+each channel's posts tab on every check. Posts are matched by URL and a hash
+of their content; new and edited posts are enriched and appended to
+``<output>/<channel>/posts_<channel>.jsonl``.
+
+Records carry the channel's title and icon from the channel metadata cache
+(see channels.py), which is only refreshed from the page when it expires.
+
+Each channel has its own polling interval, which halves when new posts show
+up and grows by half when nothing changed or the check failed, within
+[min_interval, max_interval]. Checks are jittered so channels don't line up.
+A post only counts as seen once it has been enriched and archived, so posts
+that failed are tried again on the next check.
+"""
+import json
+import time
+import heapq
+import random
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime
+
+from .channels import ChannelCache, channel_name_from_url, get_channel_metadata
+from .models import json_default
+
+THREAD_SELECTOR = 'ytd-backstage-post-thread-renderer'
+THREADS_SCRIPT = """() => Array.from(
+    document.querySelectorAll('ytd-backstage-post-thread-renderer'),
+    element => element.outerHTML
+)"""
+
+JITTER = 0.1
+# Posts remembered per channel; far more than the first page ever shows
+MAX_SEEN = 500
+
+def content_hash(post):
+    """Hash the parts of a post that change when it is edited.
+    
+    Image URLs are included so a post first seen before its images loaded is
+    archived again once they are found.
+    """
+    digest = hashlib.sha1()
+    digest.update((post.content or '').encode('utf-8'))
+    for link in post.links:
+        digest.update(link['url'].encode('utf-8'))
+    for image in post.images:
+        digest.update((image.source or image.standard or '').encode('utf-8'))
+    return digest.hexdigest()
+
+class ChannelWatch:
+    """Polling schedule and seen-post state for one channel."""
+    
+    def __init__(self, url, output_dir, interval, min_interval, max_interval):
+        self.url = url
+        self.name = channel_name_from_url(url)
+        self.dir = Path(output_dir) / self.name
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.archive_file = self.dir / f'posts_{self.name}.jsonl'
+        self.state_file = self.dir / 'watch_state.json'
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = interval
+        self.seen = {}
+        self.info = None
+        
+        if self.state_file.exists():
+            with open(self.state_file, encoding='utf-8') as f:
+                state = json.load(f)
+            self.seen = state.get('seen', {})
+            self.interval = state.get('interval', interval)
+    
+    def save_state(self):
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({'seen': self.seen, 'interval': self.interval}, f)
+    
+    def changed_posts(self, posts):
+        """Return (post, change) pairs for posts that are new or edited."""
+        changes = []
+        for post in posts:
+            if not post.post_url:
+                continue
+            previous = self.seen.get(post.post_url)
+            if previous == content_hash(post):
+                continue
+            changes.append((post, 'new' if previous is None else 'edited'))
+        return changes
+    
+    def mark_seen(self, post):
+        """Remember an archived post, keeping only the MAX_SEEN most recent."""
+        self.seen.pop(post.post_url, None)
+        self.seen[post.post_url] = content_hash(post)
+        while len(self.seen) > MAX_SEEN:
+            del self.seen[next(iter(self.seen))]
+    
+    def adapt_interval(self, found_changes):
+        if found_changes:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+    
+    def next_delay(self):
+        return self.interval * random.uniform(1 - JITTER, 1 + JITTER)
+    
+    def append(self, post, change):
+        record = {'archived_at': datetime.now().isoformat(), 'change': change}
+        if self.info:
+            record['channel'] = self.info.get('title') or self.name
+            record['channel_icon'] = self.info.get('icon', '')
+        record.update(post.to_dict())
+        with open(self.archive_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=json_default) + '\n')
+
+class Watcher:
+    """Polls channels with one warm browser."""
+    
+    def __init__(self, urls, output_dir, proxy_manager=None, browser_type='chromium',
+                 storage_state=None, get_comments=False, get_images=False,
+                 download_images=False, image_quality='all', member_only=False,
+                 interval=900, min_interval=300, max_interval=6 * 3600):
+        self.channels = [ChannelWatch(url, output_dir, interval, min_interval, max_interval)
+                         for url in urls]
+        self.proxy_manager = proxy_manager
+        self.browser_type = browser_type
+        self.storage_state = storage_state
+        self.get_comments = get_comments
+        self.get_images = get_images
+        self.download_images = download_images
+        self.image_quality = image_quality
+        self.member_only = member_only
+        self.channel_cache = ChannelCache()
+        self.driver = None
+    
+    def _get_driver(self):
+        from .browser import create_driver
+        
+        if self.driver is None:
+            self.driver = create_driver(
+                proxy_manager=self.proxy_manager,
+                browser_type=self.browser_type,
+                storage_state=self.storage_state
+            )
+        return self.driver
+    
+    def _reset_driver(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+    
+    def fetch_first_page(self, channel):
+        """Load the channel's posts tab without scrolling and parse its posts."""
+        from .scraper import parse_post_thread, parse_post_images
+        
+        driver = self._get_driver()
+        driver.goto(channel.url)
+        driver.wait_for_selector(THREAD_SELECTOR, timeout=15000)
+        # Served from the cache on most checks, so this rarely touches the page
+        channel.info = get_channel_metadata(driver, self.channel_cache)
+        
+        if self.get_images:
+            # Images are lazy-loaded, bring each post into view before reading it
+            thread_htmls = []
+            for thread in driver.query_selector_all(THREAD_SELECTOR):
+                thread.scroll_into_view_if_needed()
+                driver.wait_for_timeout(500)
+                thread_htmls.append(thread.evaluate("element => element.outerHTML"))
+        else:
+            thread_htmls = driver.evaluate(THREADS_SCRIPT)
+        
+        posts = []
+        for thread_html in thread_htmls:
+            post = parse_post_thread(thread_html)
+            if self.member_only and not post.member_only:
+                continue
+            if self.get_images:
+                post.images = parse_post_images(thread_html, self.image_quality)
+            posts.append(post)
+        return posts
+    
+    def enrich(self, channel, post):
+        from .scraper import get_post_comments, download_post_images
+        
+        if self.download_images and post.images:
+            images_dir = channel.dir / 'images'
+            images_dir.mkdir(exist_ok=True)
+            post_id = post.post_url.rstrip('/').split('/')[-1]
+            post.images = download_post_images(post, images_dir, post_id, self.image_quality,
+                                               self.proxy_manager)
+        
+        if self.get_comments:
+            post.comments = get_post_comments(
+                post_url=post.post_url,
+                driver=self._get_driver(),
+                proxy_manager=self.proxy_manager
+            )
+    
+    def check(self, channel):
+        """Run one check of a channel; returns the number of archived changes."""
+        logger = logging.getLogger('post_archiver')
+        try:
+            posts = self.fetch_first_page(channel)
+        except Exception as e:
+            logger.error(f"Failed to check {channel.name}: {str(e)}")
+            # A broken page or browser shouldn't poison later checks
+            self._reset_driver()
+            # Back off, in case the channel or YouTube is rate limiting us
+            channel.adapt_interval(False)
+            channel.save_state()
+            return 0
+        
+        changes = channel.changed_posts(posts)
+        archived = 0
+        for post, change in changes:
+            try:
+                self.enrich(channel, post)
+            except Exception as e:
+                logger.error(f"Failed to enrich {post.post_url}, retrying on the next check: {str(e)}")
+                continue
+            channel.append(post, change)
+            channel.mark_seen(post)
+            archived += 1
+            print(f"[{channel.name}] {change} post: {post.post_url}")
+        
+        channel.adapt_interval(bool(changes))
+        channel.save_state()
+        return archived
+    
+    def run(self, max_checks=None):
+        """Check channels as they come due until interrupted."""
+        schedule = [(time.monotonic(), i) for i in range(len(self.channels))]
+        heapq.heapify(schedule)
+        checks = 0
+        
+        try:
+            while schedule and (max_checks is None or checks < max_checks):
+                due, i = heapq.heappop(schedule)
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                
+                channel = self.channels[i]
+                found = self.check(channel)
+                checks += 1
+                
+                delay = channel.next_delay()
+                logging.getLogger('post_archiver').info(
+                    f"[{channel.name}] {found} changes, next check in {delay / 60:.1f} min")
+                heapq.heappush(schedule, (time.monotonic() + delay, i))
+        except KeyboardInterrupt:
+            print("\nStopping watch")
+        finally:
+            self._reset_driver()
@@ -0,0 +1,168 @@
+"""Archive file output for YouTube Community Scraper"""
+import os
+import json
+import logging
+import textwrap
+from datetime import datetime
+
+from .models import json_default
+
+def _archive_header(channel_name, channel_icon):
+    return {
+        'channel': channel_name,
+        'channel_icon': channel_icon,
+        'scrape_date': datetime.now().isoformat(),
+        'scrape_timestamp': int(datetime.now().timestamp()),
+    }
+
+def write_archive(filename, channel_name, channel_icon, posts):
+    """Write a complete archive file for a list of posts."""
+    data = _archive_header(channel_name, channel_icon)
+    data['posts_count'] = len(posts)
+    data['posts'] = posts
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
+
+class ArchiveWriter:
+    """Stream posts into an archive file one at a time.
+    
+    Posts are written as soon as they are finished so the caller can drop
+    them from memory. The file is written to ``<filename>.partial`` and only
+    renamed into place by close(), so an interrupted run never leaves a
+    truncated archive under the final name. abort(), or leaving a with block
+    with an exception, keeps the ``.partial`` file for inspection instead. Because the number of posts is
+    only known at the end, ``posts_count`` follows the ``posts`` list.
+    """
+    
+    def __init__(self, filename, channel_name, channel_icon):
+        self.filename = filename
+        self.partial_filename = f"{filename}.partial"
+        self.posts_count = 0
+        self._file = open(self.partial_filename, 'w', encoding='utf-8')
+        
+        header = _archive_header(channel_name, channel_icon)
+        self._file.write('{\n')
+        for key, value in header.items():
+            self._file.write(f'  {json.dumps(key)}: {json.dumps(value, ensure_ascii=False)},\n')
+        self._file.write('  "posts": [')
+    
+    def write_post(self, post):
+        """Append one finished post to the archive."""
+        text = json.dumps(post, ensure_ascii=False, indent=2, default=json_default)
+        self._file.write(',\n' if self.posts_count else '\n')
+        self._file.write(textwrap.indent(text, '    '))
+        self._file.flush()
+        self.posts_count += 1
+    
+    def written(self):
+        """Return (filename, count) pairs for the archive."""
+        return [(self.filename, self.posts_count)]
+    
+    def close(self):
+        """Finish the JSON document and move it to its final name."""
+        if self._file.closed:
+            return
+        self._file.write('\n  ]' if self.posts_count else ']')
+        self._file.write(f',\n  "posts_count": {self.posts_count}\n}}\n')
+        self._file.close()
+        os.replace(self.partial_filename, self.filename)
+        logging.getLogger('post_archiver').debug(f"Finished streaming archive {self.filename}")
+    
+    def abort(self):
+        """Stop writing and leave the incomplete archive at its .partial name."""
+        if self._file.closed:
+            return
+        self._file.close()
+        logging.getLogger('post_archiver').warning(
+            f"Archive incomplete, kept {self.posts_count} posts in {self.partial_filename}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+MEMBER_OUTPUTS = ('combined', 'split', 'both')
+
+def member_output_files(filename, member_output='combined'):
+    """List the archive files for a member output mode.
+    
+    Returns (filename, member_only) pairs, where member_only is None for the
+    combined archive, True for members-only posts and False for public posts.
+    """
+    if member_output not in MEMBER_OUTPUTS:
+        raise ValueError(f"Unknown member output: {member_output}")
+    base, ext = os.path.splitext(str(filename))
+    files = []
+    if member_output in ('combined', 'both'):
+        files.append((filename, None))
+    if member_output in ('split', 'both'):
+        files.append((f"{base}_members{ext}", True))
+        files.append((f"{base}_public{ext}", False))
+    return files
+
+def write_member_archives(filename, channel_name, channel_icon, posts, member_output='combined'):
+    """Write the archives for a member output mode; returns (filename, count) pairs."""
+    written = []
+    for path, member_only in member_output_files(filename, member_output):
+        selected = posts if member_only is None else [post for post in posts
+                                                      if bool(post['member_only']) == member_only]
+        write_archive(path, channel_name, channel_icon, selected)
+        written.append((path, len(selected)))
+    return written
+
+class MemberArchiveWriter:
+    """Stream posts into separate members-only and public archives.
+    
+    Each post is harvested and enriched once and then written to every
+    archive it belongs to (see member_output_files).
+    """
+    
+    def __init__(self, filename, channel_name, channel_icon, member_output='split'):
+        self.filename = filename
+        self.writers = [(ArchiveWriter(path, channel_name, channel_icon), member_only)
+                        for path, member_only in member_output_files(filename, member_output)]
+        self.posts_count = 0
+    
+    def write_post(self, post):
+        """Append one finished post to the archives it belongs to."""
+        for writer, member_only in self.writers:
+            if member_only is None or bool(post['member_only']) == member_only:
+                writer.write_post(post)
+        self.posts_count += 1
+    
+    def written(self):
+        """Return (filename, count) pairs for the archives."""
+        return [(writer.filename, writer.posts_count) for writer, _ in self.writers]
+    
+    def _close_all(self, method):
+        # One failing archive mustn't leave the others open; re-raise the first error
+        error = None
+        for writer, _ in self.writers:
+            try:
+                getattr(writer, method)()
+            except Exception as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+    
+    def close(self):
+        """Finish every archive."""
+        self._close_all('close')
+    
+    def abort(self):
+        """Leave every incomplete archive at its .partial name."""
+        self._close_all('abort')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()